@@ -0,0 +1,329 @@
+"""Headless, read-only HTTP API over the registry.
+
+Serves the dashboard's filters as JSON, for agents and scripts that match
+experiments to hardware without going through the Streamlit page::
+
+    python api.py [registry.json[:other.json...]] [--host HOST] [--port PORT]
+
+Endpoints (``GET`` or ``HEAD``):
+
+* ``/``: registry size and version, and the values the filters take.
+* ``/cells``: the records matching the filters, in registry order.
+* ``/cells/<id>``: one record.
+* ``/facets``: technique and instrument counts under the filters, as in
+  the sidebar.
+* ``/metrics``: the dashboard's metrics row under the filters.
+* ``POST /match``: ranked cells, with per-criterion score breakdowns, for
+  a batch of requirement specs sent as ``{"specs": [...], "limit": 10}``
+  (see :mod:`matching`).
+
+Filters are query parameters: ``technique`` (a canonical technique, which
+also selects everything under it in the taxonomy), ``raw_technique`` (a
+technique exactly as cells list it) and ``instrument``, each repeatable for
+several terms; the flags ``cad_only``, ``pressure_only`` and
+``high_temp_only`` (``1`` or ``true``), ``<limit>=low..high`` for any
+indexed operating limit, e.g. ``max_temp_c=50..120``, and
+``<dimension>=low..high`` for a sample dimension in millimetres, e.g.
+``diameter_mm=10..20``, which keeps cells whose parsed sample size overlaps
+the range (see :mod:`sample_sizes`). ``contains_<axis>`` and
+``overlaps_<axis>`` keep the cells whose operating envelope contains or
+overlaps planned conditions on an envelope axis, e.g.
+``contains_temp_c=80`` or ``overlaps_voltage_v=3..4.5``, answered by the
+registry's R-tree (see :mod:`envelopes`). Either end of a range may be
+left open.
+
+Every response carries an ETag derived from the registry's content hash and
+the normalized request, so an ``If-None-Match`` poll is answered with ``304
+Not Modified`` before any query runs. Bodies are gzipped for clients that
+accept it, under a tag of their own. Both the plain and gzipped bodies are kept in a
+:class:`result_cache.ResultCache`, and the registry hot-reloads through
+:class:`watcher.RegistryWatcher`, as in the dashboard.
+"""
+import argparse
+import gzip
+import hashlib
+import http.server
+import json
+import logging
+import os
+import threading
+import urllib.parse
+
+import numpy as np
+
+import matching
+import query_backends
+import registry
+import result_cache
+import watcher
+
+HOST = os.environ.get('OPERANDO_API_HOST', '127.0.0.1')
+PORT = int(os.environ.get('OPERANDO_API_PORT', 8600))
+
+# Smaller bodies go out as is; gzip would not pay for its own overhead
+GZIP_MIN_BYTES = 1024
+
+# Largest POST /match request body accepted
+MAX_REQUEST_BYTES = 8 * 1024 * 1024
+
+ROUTES = ('/', '/cells', '/facets', '/metrics')
+FLAGS = ('cad_only', 'pressure_only', 'high_temp_only')
+ENVELOPE_QUERIES = {'contains_': 'envelope_contains', 'overlaps_': 'envelope_overlaps'}
+TRUE = ('1', 'true', 'yes', 'on')
+
+log = logging.getLogger('operando.api')
+
+
+def _bound(text):
+    return float(text) if text.strip() else None
+
+
+def _range(name, text, point=False):
+    low, sep, high = text.partition('..')
+    if sep:
+        return _bound(low), _bound(high)
+    if point and text.strip():
+        return float(text), float(text)
+    raise ValueError(f"{name} takes a range such as 50..120, not {text!r}")
+
+
+def parse_filters(query, reg):
+    """Normalized filter arguments from parsed query parameters.
+
+    ``query`` is :func:`urllib.parse.parse_qs` output. Raises
+    ``ValueError`` for unknown parameters and malformed ranges.
+    """
+    limit_ranges, sample_ranges = {}, {}
+    envelope = {kwarg: {} for kwarg in ENVELOPE_QUERIES.values()}
+    for name, values in query.items():
+        prefix, _, axis = name.partition('_')
+        if name in reg.limits or name in reg.sample_dims:
+            ranges = limit_ranges if name in reg.limits else sample_ranges
+            ranges[name] = _range(name, values[-1])
+        elif prefix + '_' in ENVELOPE_QUERIES and axis in reg.envelope.positions:
+            envelope[ENVELOPE_QUERIES[prefix + '_']][axis] = _range(name, values[-1], point=True)
+        elif name not in ('technique', 'raw_technique', 'instrument') + FLAGS:
+            raise ValueError(f"Unknown filter: {name!r}")
+    return result_cache.normalize_filters(
+        technique_families=query.get('technique', ()),
+        techniques=query.get('raw_technique', ()),
+        instruments=query.get('instrument', ()),
+        limit_ranges=limit_ranges,
+        sample_ranges=sample_ranges,
+        **envelope,
+        **{flag: query.get(flag, [''])[-1].lower() in TRUE for flag in FLAGS}
+    )
+
+
+def accepts_gzip(header):
+    """Whether an ``Accept-Encoding`` header allows gzip."""
+    for coding in (header or '').split(','):
+        name, _, params = coding.strip().partition(';')
+        if name.strip().lower() in ('gzip', '*'):
+            return params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+def etag_matches(header, etag):
+    """Whether an ``If-None-Match`` header matches ``etag`` (weakly, per RFC 9110)."""
+    tags = [tag.strip() for tag in (header or '').split(',')]
+    return '*' in tags or etag in (tag[2:] if tag.startswith('W/') else tag for tag in tags)
+
+
+class RegistryAPI:
+    """The registry, its query backend and cached bodies, shared by the request threads."""
+
+    def __init__(self, reg_watcher, backend_name=query_backends.DEFAULT_BACKEND, results=None):
+        self.watcher = reg_watcher
+        self.backend_name = backend_name
+        self.results = results or result_cache.ResultCache()
+        self._backend = None
+        self._lock = threading.Lock()
+
+    def backend(self, reg):
+        """The query backend over ``reg``, rebuilt when the registry is reloaded."""
+        with self._lock:
+            if self._backend is None or self._backend.reg is not reg:
+                self._backend = query_backends.make_backend(reg, self.backend_name)
+            return self._backend
+
+    def etag(self, reg, route, filters, gzipped=False):
+        """Strong ETag for ``route`` under ``filters`` on this registry version.
+
+        The gzipped and plain bodies differ byte for byte, so a client that
+        accepts gzip gets its own tag (suffixed ``-gzip``), even for a body
+        too small to be compressed.
+        """
+        version = reg.digest or id(reg)
+        key = repr((version, reg.generation, route, result_cache.filter_key(filters)))
+        return '"%s%s"' % (hashlib.sha256(key.encode()).hexdigest()[:32], '-gzip' if gzipped else '')
+
+    def mask(self, reg, filters):
+        return self.results.get(reg, 'mask', filters, lambda: self.backend(reg).filter(**filters))
+
+    def payload(self, reg, route, filters):
+        """The JSON-ready response for ``route``; ``KeyError`` for an unknown cell."""
+        if route == '/':
+            return {
+                'cells': len(reg),
+                'digest': reg.digest,
+                'generation': reg.generation,
+                'techniques': list(reg.technique_families.terms),
+                'raw_techniques': list(reg.techniques.terms),
+                'instruments': list(reg.instruments.terms),
+                'limits': {name: None if index.bounds is None else [float(v) for v in index.bounds]
+                           for name, index in reg.limits.items()},
+                'sample_dims': {name: None if index.bounds is None else [float(v) for v in index.bounds]
+                                for name, index in reg.sample_dims.items()},
+                'envelope': {axis: None if reg.envelope.bounds(axis) is None
+                             else [float(v) for v in reg.envelope.bounds(axis)]
+                             for axis in reg.envelope.axes},
+            }
+        if route == '/cells':
+            rows = np.flatnonzero(self.mask(reg, filters))
+            return {'count': len(rows), 'cells': [reg.cells[row].to_record() for row in rows]}
+        if route == '/facets':
+            backend = self.backend(reg)
+            return {
+                'techniques': backend.facet_counts('technique_families', **filters),
+                'raw_techniques': backend.facet_counts('techniques', **filters),
+                'instruments': backend.facet_counts('instruments', **filters),
+            }
+        if route == '/metrics':
+            return reg.metrics(self.mask(reg, filters))
+        return reg.by_id[urllib.parse.unquote(route[len('/cells/'):])].to_record()
+
+    def match(self, reg, request):
+        """The ``POST /match`` response for a decoded request body."""
+        if not isinstance(request, dict) or not isinstance(request.get('specs'), list):
+            raise ValueError('Send {"specs": [...], "limit": n}')
+        limit = request.get('limit', matching.DEFAULT_LIMIT)
+        if isinstance(limit, bool) or not isinstance(limit, int) or limit < 1:
+            raise ValueError(f"limit must be a positive integer, not {limit!r}")
+        return {'digest': reg.digest, 'results': matching.match_requirements(reg, request['specs'], limit)}
+
+    def body(self, reg, route, filters, gzipped=False):
+        """``(bytes, content_encoding)`` for ``route``, served from the result cache."""
+        plain = self.results.get(
+            reg, route, filters, lambda: json.dumps(self.payload(reg, route, filters)).encode())
+        if not gzipped or len(plain) < GZIP_MIN_BYTES:
+            return plain, None
+        return self.results.get(reg, route + ' gzip', filters, lambda: gzip.compress(plain, 6)), 'gzip'
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    server_version = 'OperandoAPI/1'
+    protocol_version = 'HTTP/1.1'  # keep-alive for pollers; every response has a length
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def _respond(self, send_body):
+        api = self.server.api
+        reg = api.watcher.registry  # read once: the whole request sees one version
+        url = urllib.parse.urlsplit(self.path)
+        route = url.path.rstrip('/') or '/'
+        if route not in ROUTES and not route.startswith('/cells/'):
+            return self._send(404, self._error(f"No such endpoint: {url.path}"), send_body=send_body)
+        try:
+            filters = parse_filters(urllib.parse.parse_qs(url.query), reg)
+        except ValueError as exc:
+            return self._send(400, self._error(str(exc)), send_body=send_body)
+
+        gzipped = accepts_gzip(self.headers.get('Accept-Encoding'))
+        etag = api.etag(reg, route, filters, gzipped)
+        if etag_matches(self.headers.get('If-None-Match'), etag):
+            return self._send(304, b'', etag=etag, send_body=False)
+        try:
+            body, encoding = api.body(reg, route, filters, gzipped)
+        except KeyError:
+            return self._send(404, self._error(f"No such cell: {route[len('/cells/'):]}"), send_body=send_body)
+        self._send(200, body, etag=etag, encoding=encoding, send_body=send_body)
+
+    def do_POST(self):
+        api = self.server.api
+        reg = api.watcher.registry
+        if urllib.parse.urlsplit(self.path).path.rstrip('/') != '/match':
+            return self._send(404, self._error(f"No such endpoint: {self.path}"))
+        # The body is left unread on an error, and would otherwise be taken
+        # for the next request on the connection
+        length = (self.headers.get('Content-Length') or '0').strip()
+        if not (length.isascii() and length.isdigit()):
+            self.close_connection = True
+            return self._send(400, self._error(f"Invalid Content-Length: {length!r}"))
+        length = int(length)
+        if length > MAX_REQUEST_BYTES:
+            self.close_connection = True
+            return self._send(413, self._error(f"Request body over {MAX_REQUEST_BYTES} bytes"))
+        try:
+            body = json.dumps(api.match(reg, json.loads(self.rfile.read(length)))).encode()
+        except ValueError as exc:  # includes malformed JSON
+            return self._send(400, self._error(str(exc)))
+        encoding = None
+        if accepts_gzip(self.headers.get('Accept-Encoding')) and len(body) >= GZIP_MIN_BYTES:
+            body, encoding = gzip.compress(body, 6), 'gzip'
+        self._send(200, body, encoding=encoding)
+
+    @staticmethod
+    def _error(message):
+        return json.dumps({'error': message}).encode()
+
+    def _send(self, status, body, etag=None, encoding=None, send_body=True):
+        self.send_response(status)
+        if status != 304:
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+            # Clients may keep responses but must revalidate: a reload changes them
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        log.info("%s %s", self.address_string(), format % args)
+
+
+def make_server(path=registry.REGISTRY_PATH, host=HOST, port=PORT,
+                backend_name=query_backends.DEFAULT_BACKEND):
+    """A threaded HTTP server over the registry at ``path``, not yet serving."""
+    reg_watcher = watcher.RegistryWatcher(registry.Registry.load(path), path).start()
+    server = http.server.ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.api = RegistryAPI(reg_watcher, backend_name)
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('sources', nargs='?', default=None,
+                        help=f"registry path(s), separated by {os.pathsep!r}")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--backend', default=query_backends.DEFAULT_BACKEND,
+                        choices=sorted(query_backends.BACKENDS))
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(message)s')
+    path = registry.registry_sources(args.sources) if args.sources else registry.REGISTRY_PATH
+    server = make_server(path, args.host, args.port, args.backend)
+    log.info("Serving %d cells on http://%s:%d", len(server.api.watcher.registry), *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,17 @@
 import streamlit as st
 import pandas as pd
-import json
+import numpy as np
+
+import envelopes
+import export
+import matching
+import profiling
+import query_backends
+import registry
+import result_cache
+import sample_sizes
+import watcher
+from glossary import TECHNIQUE_DEFINITIONS
 
 # --- 1. CONFIG & DEFINITIONS ---
 st.set_page_config(
@@ -10,58 +21,56 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Technique Glossary 
-TECHNIQUE_DEFINITIONS = {
-    "Neutron Diffraction": "Sensitive to light elements (Li, O) and isotopes. Used to determine long-range crystal structure and phase evolution.",
-    "Muon spectroscopy": "A sensitive local probe (μ+SR) used to quantify ion diffusion rates (Li+, Na+) and pathways at the atomic scale.",
-    "Muon Elemental Analysis": "Uses negative muons (μ-SR/μXES) to probe elemental composition far below the surface without destruction.",
-    "SANS": "Small Angle Neutron Scattering. Probes nanoscale structures (1–100 nm), such as porosity, SEI formation, and particle morphology.",
-    "XPDF": "X-ray Pair Distribution Function. Probes local structure in disordered/amorphous materials (e.g., electrolytes).",
-    "XAS": "X-ray Absorption Spectroscopy. Probes oxidation states, bond lengths, and local coordination geometry.",
-    "XRS": "X-ray Raman Scattering. Provides electronic structure information using hard X-rays; suitable for bulk measurements.",
-    "Soft XPS": "X-ray Photoelectron Spectroscopy. Surface-sensitive (<10 nm) analysis of elemental composition and SEI chemistry.",
-    "AP-XPS": "Ambient Pressure XPS. Allows surface analysis at realistic pressures (solid-gas/solid-liquid interfaces), bridging the pressure gap.",
-    "NEXAFS": "Near-Edge X-ray Absorption Fine Structure. Probes electronic structure of light elements at surfaces.",
-    "Nano-focus XRF": "X-ray Fluorescence microscopy. Maps elemental distribution with nanoscale resolution.",
-    "XANES": "X-ray Absorption Near Edge Structure. Determines oxidation state and local symmetry.",
-    "Imaging": "Visualises macroscopic features like dendrites, gas evolution, and particle cracking (2D/3D).",
-    "XRD": "X-ray Diffraction. Determines crystal structure, lattice parameters, strain, and phase evolution during cycling.",
-    "XRD-CT": "X-ray Diffraction Computed Tomography. Combines diffraction contrast with tomography to map phase distributions and strain fields in 3D.",
-    "DFXM": "Dark Field X-ray Microscopy. Allows high-resolution mapping of crystal orientation and strain within individual grains.",
-    "EXAFS": "Extended X-ray Absorption Fine Structure. Analyzes average local structure and coordination numbers in materials lacking long-range order.",
-    "RIXS": "Resonant Inelastic X-ray Scattering. Probes orbital states and charge transfer dynamics.",
-    "Neutron Total Scattering": "Characterises non-crystalline/disordered materials (e.g., liquids) using H/D isotopic substitution.",
-    "QENS": "Quasi-Elastic Neutron Scattering. Probes slow diffusional processes like Li-ion hopping.",
-    "INS": "Inelastic Neutron Scattering. Probes vibrational modes to investigate material dynamics.",
-    "Bragg Edge Imaging": "Maps crystal texture, phase distribution, and lattice strain in real space.",
-    "Ptychography": "High-resolution phase-contrast imaging for nanoscale morphology.",
-    "Neutron Reflectometry": "Measures thin films and buried interfaces."
-}
+# Opt-in per-stage timings: OPERANDO_PROFILE=1 for everyone, ?debug=1 per session
+profile = profiling.RerunProfile(profiling.enabled_by_env() or st.query_params.get("debug") == "1")
 
 # --- 2. LOAD DATA ---
-@st.cache_data
+# cache_resource keeps one read-only Registry per process, shared by every
+# session, instead of handing each rerun its own copy of the table. The
+# watcher swaps in an incrementally updated Registry when the JSON changes.
+@st.cache_resource
 def load_registry():
     try:
-        with open('operando_cell_registry.json', 'r') as f:
-            data = json.load(f)
-        df = pd.json_normalize(data)
-        return df, data
+        # Memory-maps the columnar snapshot when it matches the JSON's hash
+        return watcher.RegistryWatcher(registry.Registry.load(registry.REGISTRY_PATH)).start()
     except FileNotFoundError:
         st.error("Registry file not found. Ensure 'operando_cell_registry.json' is in the directory.")
         st.stop()
 
-df, raw_json = load_registry()
+# Query backend behind the filter logic (OPERANDO_QUERY_BACKEND): the
+# registry's own indexes by default, or SQLite / DuckDB pushdown. Rebuilt
+# for each new registry generation; the previous one is kept for sessions
+# still mid-rerun on it.
+@st.cache_resource(max_entries=2)
+def load_query_backend(_reg, name, generation):
+    return query_backends.make_backend(_reg, name)
+
+# Masks, counts, metrics and frames per filter state, shared by every
+# session and dropped when the registry's content hash changes
+@st.cache_resource
+def load_result_cache():
+    return result_cache.ResultCache()
+
+reg = load_registry().registry  # read once: the whole rerun sees one version
+backend = load_query_backend(reg, query_backends.DEFAULT_BACKEND, reg.generation)
+results = load_result_cache()
+profile.lap("load")
 
 # --- 3. SIDEBAR FILTERS ---
 st.sidebar.header("Filter Registry")
 
-# A. Technique Filter
-all_techniques = sorted(list(set([item for sublist in df['compatibility.techniques'] for item in sublist])))
-selected_techniques = st.sidebar.multiselect("Technique", all_techniques, placeholder="e.g. Neutron Diffraction")
+# Federated registries: ids claimed by more than one source with different records
+if reg.conflicts:
+    st.sidebar.warning(
+        f"{len(reg.conflicts)} cell id(s) differ between registry sources; showing the first source's version: "
+        + ", ".join(sorted({cell_id for cell_id, _, _ in reg.conflicts}))
+    )
 
-# B. Instrument Filter
-all_instruments = sorted(list(set([item for sublist in df['compatibility.instruments'] for item in sublist])))
-selected_instruments = st.sidebar.multiselect("Instrument", all_instruments, placeholder="e.g. POLARIS")
+# The Technique and Instrument multiselects sit at the top of the sidebar but
+# are filled in last, so the count shown next to each option can reflect
+# every other filter.
+technique_slot = st.sidebar.container()
+instrument_slot = st.sidebar.container()
 
 # C. Smart Capabilities
 st.sidebar.markdown("---")
@@ -70,29 +79,125 @@ digital_twin_only = st.sidebar.checkbox("Digital Twin Ready (CAD)")
 high_temp_only = st.sidebar.checkbox("High Temperature (>100°C)")
 pressure_control = st.sidebar.checkbox("Pressure Control")
 
+# Range sliders over the operating limits, resolved by binary search on the
+# sorted limit indexes. A slider left at its full extent applies no filter.
+LIMIT_LABELS = {'max_temp_c': "Max Temperature (°C)"}
+limit_ranges = {}
+limit_axes = set()  # envelope axes a limit slider already filters
+for limit_name, limit_index in reg.limits.items():
+    if limit_index.bounds is None or limit_index.bounds[0] == limit_index.bounds[1]:
+        continue
+    low, high = (float(v) for v in limit_index.bounds)
+    limit_axes.add(envelopes.axis_of(limit_name)[0])
+    chosen = st.sidebar.slider(LIMIT_LABELS.get(limit_name, limit_name), low, high, (low, high))
+    if chosen != (low, high):
+        limit_ranges[limit_name] = chosen
+
+# Sample size sliders over the dimensions parsed from the free-text sample
+# sizes, resolved through their interval indexes: a cell passes if its size
+# overlaps the range. Moving a slider hides cells whose size is unknown.
+SAMPLE_LABELS = {
+    'diameter_mm': "Sample Diameter (mm)",
+    'width_mm': "Sample Width (mm)",
+    'height_mm': "Sample Height (mm)",
+    'inner_diameter_mm': "Sample Inner Diameter (mm)",
+}
+sample_ranges = {}
+for dim_name, dim_index in reg.sample_dims.items():
+    if dim_index.bounds is None or dim_index.bounds[0] == dim_index.bounds[1]:
+        continue
+    low, high = (float(v) for v in dim_index.bounds)
+    chosen = st.sidebar.slider(SAMPLE_LABELS.get(dim_name, dim_name), low, high, (low, high))
+    if chosen != (low, high):
+        sample_ranges[dim_name] = chosen
+
+# Planned conditions, matched against each cell's operating envelope through
+# the registry's R-tree: "contains" keeps cells that cover the whole planned
+# range, "overlaps" those that cover part of it. Sliders left at their full
+# extent apply no filter. Axes a limit slider above already filters (e.g.
+# temp_c from max_temp_c) are left out rather than offered twice.
+ENVELOPE_LABELS = {
+    'temp_c': "Temperature (°C)",
+    'pressure_bar': "Pressure (bar)",
+    'voltage_v': "Voltage (V)",
+    'current_ma': "Current (mA)",
+}
+envelope_filters = {}
+envelope_axes = {}
+for axis in reg.envelope.axes:
+    axis_bounds = reg.envelope.bounds(axis)
+    if axis in limit_axes or axis_bounds is None or axis_bounds[0] == axis_bounds[1]:
+        continue
+    envelope_axes[axis] = tuple(float(v) for v in axis_bounds)
+if envelope_axes:
+    with st.sidebar.expander("Planned Conditions"):
+        envelope_mode = st.radio("Cells whose operating envelope", ["contains", "overlaps"], horizontal=True,
+                                 key="envelope_mode")
+        planned = {}
+        for axis, (low, high) in envelope_axes.items():
+            chosen = st.slider(ENVELOPE_LABELS.get(axis, axis), low, high, (low, high), key=f"envelope_{axis}")
+            if chosen != (low, high):
+                planned[axis] = chosen
+        if planned:
+            envelope_filters[f"envelope_{envelope_mode}"] = planned
+
+capability_filters = dict(
+    cad_only=digital_twin_only,
+    pressure_only=pressure_control,
+    high_temp_only=high_temp_only,
+    limit_ranges=limit_ranges,
+    sample_ranges=sample_ranges,
+    **envelope_filters
+)
+
 # D. Glossary (Kept as secondary reference)
 st.sidebar.markdown("---")
 with st.sidebar.expander("Technique Dictionary"):
     term = st.selectbox("Select a term:", sorted(TECHNIQUE_DEFINITIONS.keys()))
     st.info(TECHNIQUE_DEFINITIONS[term])
 
-# --- 4. FILTER LOGIC ---
-filtered_df = df.copy()
-
-if selected_techniques:
-    filtered_df = filtered_df[filtered_df['compatibility.techniques'].apply(lambda x: any(i in selected_techniques for i in x))]
-
-if selected_instruments:
-    filtered_df = filtered_df[filtered_df['compatibility.instruments'].apply(lambda x: any(i in selected_instruments for i in x))]
+# A. Technique Filter (counts use the instrument selection held in session state).
+# Options are canonical techniques from the glossary taxonomy, so XAS also
+# selects cells listing "Hard X-ray XAS (Fluorescence)", XANES or EXAFS.
+all_techniques = reg.techniques.terms
+count_filters = result_cache.normalize_filters(
+    instruments=st.session_state.get("instrument_filter", []), **capability_filters
+)
+technique_counts = results.get(
+    reg, 'technique_counts', count_filters, lambda: backend.facet_counts('technique_families', **count_filters)
+)
+selected_techniques = technique_slot.multiselect(
+    "Technique", reg.technique_families.terms, key="technique_filter",
+    format_func=lambda t: f"{t} ({technique_counts[t]})",
+    placeholder="e.g. Neutron Diffraction"
+)
 
-if digital_twin_only:
-    filtered_df = filtered_df[filtered_df['digital_twin.cad_available'] == True]
+# B. Instrument Filter
+all_instruments = reg.instruments.terms
+count_filters = result_cache.normalize_filters(technique_families=selected_techniques, **capability_filters)
+instrument_counts = results.get(
+    reg, 'instrument_counts', count_filters, lambda: backend.facet_counts('instruments', **count_filters)
+)
+selected_instruments = instrument_slot.multiselect(
+    "Instrument", all_instruments, key="instrument_filter",
+    format_func=lambda i: f"{i} ({instrument_counts[i]})",
+    placeholder="e.g. POLARIS"
+)
 
-if pressure_control:
-    filtered_df = filtered_df[filtered_df['specifications.operating_limits.pressure_control'] == True]
+profile.lap("sidebar")
 
-if high_temp_only:
-    filtered_df = filtered_df[filtered_df['specifications.operating_limits.max_temp_c'].fillna(25) >= 100]
+# --- 4. FILTER LOGIC ---
+# One boolean mask over the shared registry from the query backend; facets
+# OR their terms and are ANDed with each other and the capability flags.
+# Everything derived from the mask below is cached under the same state.
+filters = result_cache.normalize_filters(
+    technique_families=selected_techniques,
+    instruments=selected_instruments,
+    **capability_filters
+)
+mask = results.get(reg, 'mask', filters, lambda: backend.filter(**filters))
+visible_rows = np.flatnonzero(mask)
+profile.lap("filter")
 
 # --- 5. DASHBOARD HEADER ---
 st.title("Operando Sample Environment Library")
@@ -103,23 +208,26 @@ st.markdown(
     """
 )
 
+metrics = results.get(reg, 'metrics', filters, lambda: reg.metrics(mask))
 m1, m2, m3, m4 = st.columns(4)
-m1.metric("Cells Found", len(filtered_df))
-m2.metric("Digital Twin Ready", len(filtered_df[filtered_df['digital_twin.cad_available']==True]))
-m3.metric("High Temp Capable", len(filtered_df[filtered_df['specifications.operating_limits.max_temp_c'].fillna(25) >= 100]))
+m1.metric("Cells Found", metrics['cells'])
+m2.metric("Digital Twin Ready", metrics['cad_ready'])
+m3.metric("High Temp Capable", metrics['high_temp'])
 m4.metric("Avg. TRL", "Research")
+profile.lap("metrics")
 
 st.markdown("---")
 
 # --- 6. MAIN TABLE ---
 st.subheader("Hardware Registry")
 
+table = results.get(reg, 'table', filters, lambda: reg.frame(mask, [
+    'name', 'type', 'digital_twin.cad_available', 
+    'compatibility.techniques', 'specifications.operating_limits.max_temp_c',
+    'contact_info.primary_email'  # <--- Added this
+]))
 st.dataframe(
-    filtered_df[[
-        'name', 'type', 'digital_twin.cad_available', 
-        'compatibility.techniques', 'specifications.operating_limits.max_temp_c',
-        'contact_info.primary_email'  # <--- Added this
-    ]],
+    table,
     use_container_width=True,
     column_config={
         'name': "Cell Name",
@@ -132,76 +240,151 @@ st.dataframe(
     hide_index=True,
     height=300
 )
+profile.lap("main_table")
+
+# --- 7. REQUIREMENT MATCHING ---
+# Ranks the filtered cells against a requirement profile rather than
+# including or excluding them; see matching.py for how each criterion scores
+st.markdown("---")
+st.subheader("Requirement Matching")
+
+CRITERION_LABELS = {
+    'techniques': "Techniques",
+    'temperature_c': "Temperature",
+    'pressure_control': "Pressure",
+    'sample_size': "Sample Size",
+    'window_materials': "Windows",
+    'acceptable_risks': "3R Risks",
+}
 
-# --- 7. COMPARISON & DEEP DIVE ---
+with st.expander("Rank cells against your experiment's requirements"):
+    r_left, r_right = st.columns(2)
+    with r_left:
+        need_techniques = st.multiselect("Techniques needed", reg.technique_families.terms, key="match_techniques")
+        need_temperature = st.number_input("Target temperature (°C)", value=None, step=5.0, placeholder="Any", key="match_temperature")
+        need_pressure = st.checkbox("Needs pressure control", key="match_pressure")
+    with r_right:
+        sample_options = sorted({size for size in reg.column('specifications.sample_size') if isinstance(size, str)})
+        need_sample = st.selectbox("Sample size", sample_options, index=None, placeholder="Any", key="match_sample")
+        ok_windows = st.multiselect("Acceptable window materials", reg.window_materials.terms, placeholder="Any", key="match_windows")
+        ok_risks = st.multiselect("Acceptable 3R risks", reg.limitation_phrases.terms, placeholder="Not considered", key="match_risks")
+
+    match_profile = {}
+    if need_techniques:
+        match_profile['techniques'] = need_techniques
+    if need_temperature is not None:
+        match_profile['temperature_c'] = need_temperature
+    if need_pressure:
+        match_profile['pressure_control'] = True
+    if need_sample:
+        match_profile['sample_size'] = need_sample
+    if ok_windows:
+        match_profile['window_materials'] = ok_windows
+    if ok_risks:
+        match_profile['acceptable_risks'] = ok_risks
+
+    if match_profile:
+        st.caption("Relative weight of each requirement")
+        weight_cols = st.columns(len(match_profile))
+        match_profile['weights'] = {
+            name: weight_col.slider(CRITERION_LABELS[name], 0.0, 5.0, 1.0, 0.5, key=f"match_weight_{name}")
+            for weight_col, name in zip(weight_cols, list(match_profile))
+        }
+        if not any(match_profile['weights'].values()):
+            st.caption("Give at least one requirement a weight above zero to rank the cells.")
+        else:
+            ranked = matching.rank(reg, match_profile, mask=mask, limit=25)
+            score_column = lambda label: st.column_config.ProgressColumn(label, min_value=0, max_value=1, format="%.2f")
+            st.dataframe(
+                ranked.drop(columns='id'),
+                use_container_width=True,
+                column_config={
+                    'name': "Cell Name",
+                    'score': score_column("Score"),
+                    **{name: score_column(label) for name, label in CRITERION_LABELS.items()}
+                },
+                hide_index=True
+            )
+    else:
+        st.caption("State at least one requirement to rank the cells that pass the sidebar filters.")
+
+profile.lap("matching")
+
+# --- 8. COMPARISON & DEEP DIVE ---
 st.markdown("---")
 st.subheader("Cell Comparison & Deep Dive")
 
-selected_cell_names = st.multiselect(
+# Cells are selected by id; deep links may pass ids or names, e.g. ?cell=cell_003
+visible_cell_ids = reg.ids[visible_rows].tolist()
+linked_ids = []
+for key in st.query_params.get_all("cell"):
+    linked = reg.by_id.get(key) or reg.by_name.get(key)
+    if linked and linked.id in visible_cell_ids and linked.id not in linked_ids:
+        linked_ids.append(linked.id)
+
+selected_cell_ids = st.multiselect(
     "Select cells to compare (Max 3):", 
-    filtered_df['name'].unique(),
+    visible_cell_ids,
+    format_func=lambda cell_id: reg.by_id[cell_id].name,
     max_selections=3,
-    default=[filtered_df['name'].iloc[0]] if not filtered_df.empty else None
+    default=linked_ids[:3] or ([visible_cell_ids[0]] if visible_cell_ids else None)
 )
 
-if selected_cell_names:
-    cols = st.columns(len(selected_cell_names))
+if selected_cell_ids:
+    cols = st.columns(len(selected_cell_ids))
     
-    for idx, cell_name in enumerate(selected_cell_names):
-        cell_data = next(item for item in raw_json if item["name"] == cell_name)
-        limits = cell_data['specifications']['operating_limits']
-        r3 = cell_data.get('limitations_3r', {})
+    for idx, cell_id in enumerate(selected_cell_ids):
+        cell = reg.by_id[cell_id]
 
         with cols[idx]:
-            st.markdown(f"### {cell_data['name']}")
-            st.caption(f"Type: {cell_data['type']}")
+            st.markdown(f"### {cell.name}")
+            st.caption(f"Type: {cell.type}")
             
             # --- CONTACT BUTTON ---
-            email = cell_data.get('contact_info', {}).get('primary_email', 'N/A')
+            email = cell.primary_email or 'N/A'
             st.link_button(f"📧 Contact Support", f"mailto:{email}", use_container_width=True)
 
             with st.container(border=True):
                 st.write("**Key Specifications**")
-                st.write(f"Max Temp: {limits.get('max_temp_c', 25)}°C")
-                st.write(f"Pressure Control: {'Yes' if limits.get('pressure_control') else 'No'}")
-                st.write(f"CAD Available: {'Yes' if cell_data['digital_twin']['cad_available'] else 'No'}")
+                st.write(f"Max Temp: {cell.limit('max_temp_c', 25)}°C")
+                st.write(f"Pressure Control: {'Yes' if cell.pressure_control else 'No'}")
+                st.write(f"CAD Available: {'Yes' if cell.cad_available else 'No'}")
+                st.write(f"Sample Size: {cell.sample_size or 'N/A'}")
+                sample_dims, sample_confidence = reg.parsed_sample_sizes[cell.sample_size]
+                if sample_dims:
+                    st.caption(f"{sample_sizes.describe(sample_dims)} ({sample_confidence})")
 
             # --- NEW: Integrated Glossary ---
             with st.expander("Supported Techniques (Definitions)", expanded=False):
-                for tech in cell_data['compatibility']['techniques']:
-                    # Find partial match
-                    desc = "Definition unavailable."
-                    for key, val in TECHNIQUE_DEFINITIONS.items():
-                        if key.lower() in tech.lower():
-                            desc = val
-                            break
+                for tech in cell.techniques:
+                    # Glossary term resolved at load (longest match)
+                    term = reg.glossary_terms.get(tech)
                     st.markdown(f"**{tech}**")
-                    st.caption(desc)
+                    st.caption(TECHNIQUE_DEFINITIONS[term] if term else "Definition unavailable.")
 
             st.markdown("#### The 3Rs Profile")
             st.error("Reliability")
-            for i in r3.get('reliability', []): st.markdown(f"- {i}")
+            for i in cell.limitations('reliability'): st.markdown(f"- {i}")
             
             st.warning("Representativeness")
-            for i in r3.get('representativeness', []): st.markdown(f"- {i}")
+            for i in cell.limitations('representativeness'): st.markdown(f"- {i}")
             
             st.info("Reproducibility")
-            for i in r3.get('reproducibility', []): st.markdown(f"- {i}")
+            for i in cell.limitations('reproducibility'): st.markdown(f"- {i}")
+
+profile.lap("comparison")
 
-# --- 8. COMPATIBILITY MATRIX ---
+# --- 9. COMPATIBILITY MATRIX ---
 st.markdown("---")
 st.subheader("Technique Compatibility Matrix")
 
-technique_matrix = []
-for entry in raw_json:
-    if entry['name'] in filtered_df['name'].values:
-        row = {"Cell": entry['name']}
-        for tech in all_techniques:
-            row[tech] = tech in entry['compatibility']['techniques']
-        technique_matrix.append(row)
-
-if technique_matrix:
-    df_matrix = pd.DataFrame(technique_matrix).set_index("Cell")
+# Rows of the precomputed cells x techniques matrix for the visible cells
+if mask.any():
+    df_matrix = results.get(reg, 'matrix', filters, lambda: pd.DataFrame(
+        reg.techniques.matrix(mask),
+        index=pd.Index(reg.names[visible_rows], name="Cell"),
+        columns=all_techniques
+    ))
     column_config = {col: st.column_config.CheckboxColumn(col) for col in df_matrix.columns}
     st.dataframe(
         df_matrix,
@@ -209,7 +392,9 @@ if technique_matrix:
         column_config=column_config
     )
 
-# --- 9. FOOTER & DOWNLOAD ---
+profile.lap("matrix")
+
+# --- 10. FOOTER & DOWNLOAD ---
 st.markdown("---")
 c_left, c_right = st.columns([3, 1])
 
@@ -218,15 +403,32 @@ with c_left:
     st.caption("Reference: [Autonomous battery research: Principles of heuristic operando experimentation (arXiv:2601.00851)](https://arxiv.org/abs/2601.00851)")
 
 with c_right:
-    # Filter the download data to match what the user is currently seeing
-    visible_ids = filtered_df['id'].tolist()
-    filtered_json_download = [entry for entry in raw_json if entry['id'] in visible_ids]
+    # Export exactly what the user is currently seeing. The file is only
+    # generated, in chunks, when the button is clicked.
+    export_format = st.selectbox("Export format", list(export.FORMATS), label_visibility="collapsed")
+    extension, mime, _ = export.FORMATS[export_format]
 
     st.download_button(
-        label="📥 Download JSON",
-        data=json.dumps(filtered_json_download, indent=2),
-        file_name="filtered_cell_registry.json",
-        mime="application/json",
+        label=f"📥 Download {export_format}",
+        data=lambda: export.spool(reg, mask, export_format),
+        file_name=f"filtered_cell_registry.{extension}",
+        mime=mime,
+        on_click="ignore",
         use_container_width=True
-
     )
+
+profile.lap("download")
+
+# --- 11. DEBUG TIMINGS ---
+profile.finish(visible_rows=len(visible_rows), result_cache=results.stats())
+if profile.enabled:
+    with st.expander("Debug: rerun timings"):
+        st.caption(f"Total {profile.total_s * 1e3:.1f} ms · peak traced memory {profile.peak_bytes / 2**20:.1f} MiB · logged to `{profiling.LOG_PATH}`")
+        st.dataframe(
+            pd.DataFrame(
+                [(s['stage'], s['seconds'] * 1e3, s['peak_bytes'] / 2**20) for s in profile.stages],
+                columns=["Stage", "Time (ms)", "Peak memory (MiB)"]
+            ),
+            hide_index=True,
+            use_container_width=True
+        )
@@ -0,0 +1,325 @@
+"""Synthetic-registry benchmarks for the dashboard's hot paths.
+
+Generates registries of 1e3 to 1e6 cells from the vocabulary of the real
+registry (techniques, instruments, window materials and the 3R limitation
+phrases) and times each dashboard stage on its own. Every run writes its
+timings to ``benchmarks/last_run.json`` and compares them with the stored
+baseline, so regressions show up from one run to the next. Timings depend
+on the machine, so none is committed: record one with ``--update-baseline``
+first::
+
+    python benchmarks/bench_registry.py --update-baseline    # accept timings
+    python benchmarks/bench_registry.py                      # all sizes
+    python benchmarks/bench_registry.py --sizes 1e3 1e4      # quick run
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import export  # noqa: E402
+import ingest  # noqa: E402
+import matching  # noqa: E402
+import query_backends  # noqa: E402
+import registry  # noqa: E402
+
+DEFAULT_SIZES = ('1e3', '1e4', '1e5', '1e6')
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+LAST_RUN_PATH = os.path.join(ROOT, 'benchmarks', 'last_run.json')
+
+# Columns shown in the dashboard's main table
+TABLE_COLUMNS = [
+    'name', 'type', 'digital_twin.cad_available', 'compatibility.techniques',
+    'specifications.operating_limits.max_temp_c', 'contact_info.primary_email',
+]
+
+# Differences below this are timer noise, whatever the ratio
+NOISE_FLOOR_S = 0.001
+
+
+# --- Synthetic registries ---
+
+def seed_vocabulary(records, n_techniques=None):
+    """Pools of values to draw synthetic cells from, taken from real records."""
+    vocab = {
+        'types': set(), 'emails': set(), 'sample_sizes': set(),
+        'techniques': set(), 'instruments': set(), 'window_materials': set(),
+        'max_temp_c': set(), 'limitations_3r': {},
+    }
+    for record in records:
+        vocab['types'].add(record['type'])
+        vocab['emails'].add(record.get('contact_info', {}).get('primary_email', 'N/A'))
+        vocab['techniques'].update(record['compatibility']['techniques'])
+        vocab['instruments'].update(record['compatibility']['instruments'])
+        specs = record['specifications']
+        vocab['sample_sizes'].add(specs['sample_size'])
+        vocab['window_materials'].update(specs['window_materials'])
+        vocab['max_temp_c'].add(specs['operating_limits'].get('max_temp_c', 25))
+        for category, phrases in record.get('limitations_3r', {}).items():
+            vocab['limitations_3r'].setdefault(category, set()).update(phrases)
+
+    vocab = {
+        key: sorted(value) if isinstance(value, set)
+        else {k: sorted(v) for k, v in value.items()}
+        for key, value in vocab.items()
+    }
+    # Pad the technique vocabulary with variants of the real names
+    base = vocab['techniques']
+    while n_techniques and len(vocab['techniques']) < n_techniques:
+        k = len(vocab['techniques'])
+        vocab['techniques'].append(f"{base[k % len(base)]} (variant {k // len(base)})")
+    return vocab
+
+
+def synthetic_cells(n, vocab, seed=0):
+    """Yield ``n`` registry records shaped like the real ones."""
+    rng = random.Random(seed)
+    for i in range(n):
+        yield {
+            'id': f"syn_{i:07d}",
+            'name': f"Synthetic Cell {i}",
+            'type': rng.choice(vocab['types']),
+            'contact_info': {'primary_email': rng.choice(vocab['emails'])},
+            'compatibility': {
+                'instruments': rng.sample(vocab['instruments'], rng.randint(1, 3)),
+                'techniques': rng.sample(vocab['techniques'], rng.randint(1, 4)),
+            },
+            'specifications': {
+                'sample_size': rng.choice(vocab['sample_sizes']),
+                'window_materials': rng.sample(vocab['window_materials'], rng.randint(1, 3)),
+                'operating_limits': {
+                    'max_temp_c': rng.choice(vocab['max_temp_c']),
+                    'pressure_control': rng.random() < 0.2,
+                },
+            },
+            'limitations_3r': {
+                category: rng.sample(phrases, min(len(phrases), rng.randint(1, 2)))
+                for category, phrases in vocab['limitations_3r'].items()
+            },
+            'digital_twin': {'cad_available': rng.random() < 0.4},
+        }
+
+
+def write_registry(path, cells):
+    """Write records as a JSON array, or as NDJSON for a ``.ndjson`` path,
+    without holding the text in memory."""
+    if path.endswith('.ndjson'):
+        with open(path, 'w') as f:
+            f.writelines(json.dumps(cell) + '\n' for cell in cells)
+        return
+    with open(path, 'w') as f:
+        f.write('[')
+        for i, cell in enumerate(cells):
+            if i:
+                f.write(',\n')
+            f.write(json.dumps(cell))
+        f.write(']')
+
+
+# --- Timing ---
+
+def timed(fn, repeat, setup=None):
+    """Run ``fn`` ``repeat`` times and summarise wall-clock seconds."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return {'min': min(times), 'median': statistics.median(times), 'repeat': repeat}, result
+
+
+def bench_size(path, repeat, rng, backend_name='memory'):
+    """Time every dashboard stage against the registry at ``path``.
+
+    Filters and facet counts go through the query backend ``backend_name``.
+    """
+    stages = {}
+    snapshot = registry.snapshot_path(path, registry.content_hash(path))
+
+    def drop_snapshot():
+        if os.path.exists(snapshot):
+            os.remove(snapshot)
+
+    # 2. LOAD DATA: JSON parse into cells, then the snapshot the parse leaves
+    # behind, then the registry cache a restarted process starts from
+    stages['load_registry_json'], _ = timed(
+        lambda: registry.load_registry(path), repeat, setup=drop_snapshot)
+    if registry.pa is not None:
+        stages['load_registry_snapshot'], _ = timed(lambda: registry.load_registry(path), repeat)
+    cells = registry.load_registry(path)
+    stages['build_indexes'], reg = timed(lambda: registry.Registry(cells, source=path), repeat)
+    registry.write_cache(reg, path, registry.content_hash(path))
+    stages['load_registry_cache'], _ = timed(lambda: registry.Registry.load(path), repeat)
+
+    # 3. SIDEBAR: the vocabularies come out of the facet indexes
+    stages['sidebar_vocabulary'], _ = timed(
+        lambda: (registry.FacetIndex(c.techniques for c in cells).terms,
+                 registry.FacetIndex(c.instruments for c in cells).terms),
+        repeat)
+
+    # 4. FILTER LOGIC: each filter on its own, then all of them together
+    stages['build_backend'], backend = timed(
+        lambda: query_backends.make_backend(reg, backend_name), 1)
+    techniques = rng.sample(reg.techniques.terms, min(3, len(reg.techniques.terms)))
+    instruments = rng.sample(reg.instruments.terms, min(3, len(reg.instruments.terms)))
+    families = rng.sample(reg.technique_families.terms, min(2, len(reg.technique_families.terms)))
+    filters = {
+        'technique': {'techniques': techniques},
+        'technique_family': {'technique_families': families},
+        'instrument': {'instruments': instruments},
+        'cad': {'cad_only': True},
+        'pressure': {'pressure_only': True},
+        'high_temp': {'high_temp_only': True},
+        'max_temp_range': {'limit_ranges': {'max_temp_c': (50, 120)}},
+        'sample_diameter_range': {'sample_ranges': {'diameter_mm': (10, 20)}},
+        'envelope_contains': {'envelope_contains': {'temp_c': (80, 80)}},
+        'envelope_overlaps': {'envelope_overlaps': {'temp_c': (50, 120)}},
+        'combined': {'techniques': techniques, 'instruments': instruments, 'cad_only': True},
+    }
+    for name, kwargs in filters.items():
+        stages[f"filter_{name}"], _ = timed(lambda: backend.filter(**kwargs), repeat)
+
+    stages['facet_counts'], _ = timed(
+        lambda: (backend.facet_counts('techniques', instruments=instruments),
+                 backend.facet_counts('instruments', techniques=techniques)),
+        repeat)
+
+    # Batch requirement matching, as an agent would send it to the API
+    specs = [
+        {'techniques': rng.sample(reg.techniques.terms, min(2, len(reg.techniques.terms))),
+         'temperature_c': rng.choice((25, 80, 150)), 'pressure_control': rng.random() < 0.3}
+        for _ in range(100)
+    ]
+    stages['match_100_specs'], _ = timed(lambda: matching.match_requirements(reg, specs), repeat)
+    profile = {**specs[0], 'window_materials': reg.window_materials.terms[:2],
+               'weights': {'techniques': 3}}
+    stages['rank_profile'], _ = timed(lambda: matching.rank(reg, profile, limit=25), repeat)
+
+    # 5-9 run unfiltered, the worst case for everything downstream
+    mask = reg.all_rows()
+    rows = np.flatnonzero(mask)
+    stages['metrics'], _ = timed(lambda: reg.metrics(mask), repeat)
+    stages['main_table'], _ = timed(lambda: reg.frame(mask, TABLE_COLUMNS), repeat)
+    stages['compatibility_matrix'], _ = timed(
+        lambda: pd.DataFrame(reg.techniques.matrix(mask),
+                             index=pd.Index(reg.names[rows], name="Cell"),
+                             columns=reg.techniques.terms),
+        repeat)
+    for fmt in export.FORMATS:
+        stages[f"export_{fmt.lower()}"], _ = timed(lambda: export.spool(reg, mask, fmt), repeat)
+    return stages
+
+
+# --- Baselines ---
+
+def compare(results, baseline, tolerance):
+    """Print current vs. baseline minima; return the regressed stages."""
+    regressions = []
+    for size, stages in results.items():
+        previous = baseline.get(size, {})
+        print(f"\n{int(size):>9,} cells")
+        for stage, timing in stages.items():
+            line = f"  {stage:<24} {timing['min'] * 1e3:12.3f} ms"
+            if stage in previous:
+                before = previous[stage]['min']
+                ratio = timing['min'] / before if before else float('inf')
+                line += f"   x{ratio:5.2f} vs baseline"
+                if ratio > tolerance and timing['min'] - before > NOISE_FLOOR_S:
+                    line += "   REGRESSION"
+                    regressions.append((size, stage, ratio))
+            print(line)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES,
+                        help="registry sizes to generate, e.g. 1e3 25000")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per stage")
+    parser.add_argument('--techniques', type=int, default=None,
+                        help="pad the technique vocabulary to this many terms")
+    parser.add_argument('--backend', default='memory', choices=sorted(query_backends.BACKENDS),
+                        help="query backend for the filter and facet count stages")
+    parser.add_argument('--layout', default='json', choices=('json', 'ndjson'),
+                        help="registry file layout to load from")
+    parser.add_argument('--registry', default=os.environ.get('OPERANDO_REGISTRY_PATH', 'operando_cell_registry.json'),
+                        help="registry to seed the vocabulary from; join several sources with os.pathsep")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--output', default=LAST_RUN_PATH)
+    parser.add_argument('--tolerance', type=float, default=1.25,
+                        help="slowdown ratio that counts as a regression")
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="store this run as the new baseline")
+    args = parser.parse_args(argv)
+
+    sources = registry.registry_sources(args.registry)
+    if not isinstance(sources, list):
+        sources = [sources]
+    records = (record for source in sources for record in ingest.iter_records(os.path.join(ROOT, source)))
+    vocab = seed_vocabulary(records, args.techniques)
+
+    rng = random.Random(args.seed)
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='operando-bench-') as tmp:
+        for size in args.sizes:
+            n = int(float(size))
+            path = os.path.join(tmp, f"registry_{n}.{args.layout}")
+            write_registry(path, synthetic_cells(n, vocab, seed=args.seed))
+            results[str(n)] = bench_size(path, args.repeat, rng, args.backend)
+            os.remove(path)
+
+    run = {
+        'meta': {
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'repeat': args.repeat,
+            'techniques': len(vocab['techniques']),
+            'seed': args.seed,
+            'backend': args.backend,
+            'layout': args.layout,
+            'workers': ingest.WORKERS,
+        },
+        'results': results,
+    }
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    elif not args.update_baseline:
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one")
+    regressions = compare(results, baseline, args.tolerance)
+
+    with open(args.output, 'w') as f:
+        json.dump(run, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"\nBaseline updated: {args.baseline}")
+    elif regressions:
+        print(f"\n{len(regressions)} stage(s) slower than baseline by more than x{args.tolerance}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,285 @@
+"""Typed, compact model of a registry cell.
+
+A :class:`Cell` is built once at load and replaces both the nested record
+dicts and the wide flattened DataFrame the dashboard used to keep. Fields
+are slotted. Values shared between cells (cell types, contacts, sample
+sizes, technique and instrument names, window materials, limitation
+phrases, and whole lists of them) are interned through an
+:class:`Interner`, so a thousand cells citing "Electrolyte settling" hold
+one string.
+
+``Cell.from_record(...).to_record()`` reproduces the original record. The
+rare record that does not fit the schema keeps its original dict in
+``raw``, so nothing is lost on export.
+"""
+import operator
+import sys
+
+# json_normalize-style names of the flattened columns, in schema order; the
+# operating limit and 3R columns follow ``specifications.window_materials``
+# and ``limitations_3r`` respectively, one per key present in the registry
+BASE_COLUMNS = (
+    'id', 'name', 'type', 'contact_info.primary_email',
+    'compatibility.instruments', 'compatibility.techniques',
+    'specifications.sample_size', 'specifications.window_materials',
+)
+LIMITS_PREFIX = 'specifications.operating_limits.'
+LIMITATIONS_PREFIX = 'limitations_3r.'
+CAD_COLUMN = 'digital_twin.cad_available'
+
+LIMITATION_CATEGORIES = ('reliability', 'representativeness', 'reproducibility')
+
+# Top-level record keys in schema order
+DEFAULT_KEYS = (
+    'id', 'name', 'type', 'contact_info', 'compatibility', 'specifications',
+    'limitations_3r', 'digital_twin',
+)
+
+# Key order of the nested objects whose every field a Cell keeps
+# (``limitations_3r`` may hold any categories)
+_NESTED_KEYS = {
+    'contact_info': ('primary_email',),
+    'compatibility': ('instruments', 'techniques'),
+    'specifications': ('sample_size', 'window_materials', 'operating_limits'),
+    'digital_twin': ('cad_available',),
+}
+_SCALAR_KEYS = frozenset(('id', 'name', 'type'))
+_ANY = {'primary_email': '', 'cad_available': False}
+
+
+def _in_schema(record):
+    """Whether ``record`` has only the keys, key order and container types
+    a Cell reproduces, so it round-trips without being rebuilt and compared."""
+    for key, value in record.items():
+        shape = _NESTED_KEYS.get(key)
+        if shape is not None:
+            if type(value) is not dict or tuple(value) != shape:
+                return False
+        elif key == 'limitations_3r':
+            if type(value) is not dict:
+                return False
+            for phrases in value.values():
+                if type(phrases) is not list:
+                    return False
+        elif key not in _SCALAR_KEYS:
+            return False
+    compatibility = record.get('compatibility')
+    specs = record.get('specifications')
+    return not (
+        compatibility and (type(compatibility['instruments']) is not list
+                           or type(compatibility['techniques']) is not list)
+        or specs and (type(specs['window_materials']) is not list
+                      or type(specs['operating_limits']) is not dict)
+        or record.get('contact_info', _ANY)['primary_email'] is None
+        or record.get('digital_twin', _ANY)['cad_available'] is None
+    )
+
+
+class Interner:
+    """Hands out one shared copy of each repeated value during a load."""
+
+    def __init__(self):
+        self._pool = {}
+
+    def __call__(self, value):
+        """The shared copy of a string; any other value as is."""
+        return sys.intern(value) if type(value) is str else value
+
+    def strings(self, values):
+        """A shared tuple of interned strings, or a plain tuple of ``values``
+        when they are not all strings."""
+        key = tuple(values)
+        try:
+            shared = self._pool.get(key)
+            if shared is None:
+                shared = self._pool[key] = tuple(map(sys.intern, key))
+        except TypeError:  # off-schema list, kept as is
+            return key
+        return shared
+
+    def pairs(self, mapping, convert=None):
+        """A shared tuple of the ``(key, value)`` pairs of ``mapping``.
+
+        ``mapping`` is a dict or an iterable of pairs. Values are first
+        passed through ``convert`` when given. Pooling tells ``1``, ``1.0``
+        and ``True`` apart, so values round-trip as they were.
+        """
+        pairs = mapping.items() if isinstance(mapping, dict) else mapping
+        items = tuple((self(k), convert(v) if convert else v) for k, v in pairs)
+        try:
+            return self._pool.setdefault(tuple((k, type(v), v) for k, v in items), items)
+        except TypeError:  # unhashable value (e.g. a list-valued limit)
+            return items
+
+    def share(self, cell):
+        """Swap ``cell``'s values for the shared copies and return it.
+
+        For cells built with another interner, e.g. in a worker process.
+        """
+        cell.type = self(cell.type)
+        cell.primary_email = self(cell.primary_email)
+        cell.sample_size = self(cell.sample_size)
+        cell.instruments = self.strings(cell.instruments)
+        cell.techniques = self.strings(cell.techniques)
+        cell.window_materials = self.strings(cell.window_materials)
+        cell.operating_limits = self.pairs(cell.operating_limits)
+        if cell.limitations_3r is not None:
+            cell.limitations_3r = self.pairs(cell.limitations_3r, self.strings)
+        cell.keys = self.strings(cell.keys)
+        return cell
+
+
+class Cell:
+    """One sample environment from the registry.
+
+    ``operating_limits`` and ``limitations_3r`` are tuples of ``(key, value)``
+    pairs in record order; ``limitations_3r`` is ``None`` when the record
+    has none. List-valued fields are tuples. ``keys`` is the record's
+    top-level key order, which :meth:`to_record` reproduces.
+    """
+
+    __slots__ = (
+        'id', 'name', 'type', 'primary_email', 'instruments', 'techniques',
+        'sample_size', 'window_materials', 'operating_limits', 'limitations_3r',
+        'cad_available', 'keys', 'raw',
+    )
+
+    def __init__(self, id, name, type, primary_email, instruments, techniques,
+                 sample_size, window_materials, operating_limits, limitations_3r,
+                 cad_available, keys=DEFAULT_KEYS, raw=None):
+        self.id = id
+        self.name = name
+        self.type = type
+        self.primary_email = primary_email
+        self.instruments = instruments
+        self.techniques = techniques
+        self.sample_size = sample_size
+        self.window_materials = window_materials
+        self.operating_limits = operating_limits
+        self.limitations_3r = limitations_3r
+        self.cad_available = cad_available
+        self.keys = keys
+        self.raw = raw
+
+    def __repr__(self):
+        return f"Cell(id={self.id!r}, name={self.name!r})"
+
+    @classmethod
+    def from_record(cls, record, intern=None):
+        """Build a cell from a registry record (a parsed JSON object)."""
+        intern = intern or Interner()
+        strings = intern.strings
+        get = record.get
+        compatibility = get('compatibility') or {}
+        specs = get('specifications') or {}
+        limitations = get('limitations_3r')
+        cell = cls(
+            id=get('id'),
+            name=get('name'),
+            type=intern(get('type')),
+            primary_email=intern((get('contact_info') or {}).get('primary_email')),
+            instruments=strings(compatibility.get('instruments') or ()),
+            techniques=strings(compatibility.get('techniques') or ()),
+            sample_size=intern(specs.get('sample_size')),
+            window_materials=strings(specs.get('window_materials') or ()),
+            operating_limits=intern.pairs(specs.get('operating_limits') or {}),
+            limitations_3r=None if limitations is None else (
+                tuple([(intern(k), strings(v)) for k, v in limitations.items()]) if type(limitations) is dict
+                else intern.pairs(limitations, strings)),
+            cad_available=(get('digital_twin') or {}).get('cad_available'),
+            keys=strings(record),
+        )
+        if _in_schema(record):
+            return cell
+        # Values are kept as they were, so equality plus key order is an
+        # exact check that the record round-trips
+        rebuilt = cell.to_record()
+        if rebuilt != record or list(rebuilt) != list(record) or any(
+                list(rebuilt[key]) != list(value) for key, value in record.items()
+                if isinstance(value, dict)):
+            cell.raw = record
+        return cell
+
+    def to_record(self):
+        """The cell as a registry record (a JSON-ready dict)."""
+        if self.raw is not None:
+            return self.raw
+        parts = {'id': self.id, 'name': self.name, 'type': self.type}
+        if self.primary_email is not None:
+            parts['contact_info'] = {'primary_email': self.primary_email}
+        parts['compatibility'] = {
+            'instruments': list(self.instruments),
+            'techniques': list(self.techniques),
+        }
+        parts['specifications'] = {
+            'sample_size': self.sample_size,
+            'window_materials': list(self.window_materials),
+            'operating_limits': dict(self.operating_limits),
+        }
+        if self.limitations_3r is not None:
+            parts['limitations_3r'] = {k: list(v) for k, v in self.limitations_3r}
+        if self.cad_available is not None:
+            parts['digital_twin'] = {'cad_available': self.cad_available}
+        return {key: parts[key] for key in self.keys if key in parts}
+
+    def limit(self, name, default=None):
+        """The operating limit ``name`` (e.g. ``'max_temp_c'``), or ``default``."""
+        for key, value in self.operating_limits:
+            if key == name:
+                return value
+        return default
+
+    def limitations(self, category):
+        """The 3R limitation phrases for ``category`` (may be empty)."""
+        for key, phrases in self.limitations_3r or ():
+            if key == category:
+                return phrases
+        return ()
+
+    def same(self, other):
+        """Whether ``other`` holds the same values, e.g. a reloaded copy."""
+        return _STATE(self) == _STATE(other)
+
+    @property
+    def pressure_control(self):
+        return bool(self.limit('pressure_control'))
+
+    def flat(self, column):
+        """The value of a flattened (json_normalize-style) column."""
+        if column.startswith(LIMITS_PREFIX):
+            return self.limit(column[len(LIMITS_PREFIX):])
+        if column.startswith(LIMITATIONS_PREFIX):
+            category = column[len(LIMITATIONS_PREFIX):]
+            return self.limitations(category) if self.limitations_3r is not None else None
+        return _FLAT_GETTERS[column](self)
+
+
+_STATE = operator.attrgetter(*Cell.__slots__)
+
+_FLAT_GETTERS = {
+    'id': lambda c: c.id,
+    'name': lambda c: c.name,
+    'type': lambda c: c.type,
+    'contact_info.primary_email': lambda c: c.primary_email,
+    'compatibility.instruments': lambda c: c.instruments,
+    'compatibility.techniques': lambda c: c.techniques,
+    'specifications.sample_size': lambda c: c.sample_size,
+    'specifications.window_materials': lambda c: c.window_materials,
+    CAD_COLUMN: lambda c: c.cad_available,
+}
+
+
+def flat_columns(cells):
+    """Flattened column names for ``cells``, in schema order."""
+    limits, categories = {}, {}
+    for cell in cells:
+        for key, _ in cell.operating_limits:
+            limits.setdefault(key, None)
+        for key, _ in cell.limitations_3r or ():
+            categories.setdefault(key, None)
+    return (
+        list(BASE_COLUMNS)
+        + [LIMITS_PREFIX + key for key in limits]
+        + [LIMITATIONS_PREFIX + key for key in categories]
+        + [CAD_COLUMN]
+    )
@@ -0,0 +1,209 @@
+"""Operating envelopes, and an R-tree over them.
+
+A cell's operating envelope is the box spanned by its numeric operating
+limits, one axis per quantity:
+
+* ``min_<axis>`` and ``max_<axis>`` bound an axis from below and above, so
+  ``max_temp_c`` is the top of ``temp_c``.
+* A ``[low, high]`` pair gives both ends, with ``range`` and ``window``
+  dropped from its name, so ``voltage_window_v`` spans ``voltage_v`` and
+  ``temp_range_c`` spans ``temp_c``.
+* Any other number is a single point on its own axis.
+
+An end a cell leaves open is unbounded; an axis it does not state at all is
+unknown (NaN), and the cell never matches a query on that axis.
+
+:class:`EnvelopeIndex` packs the envelopes into a static R-tree, bulk
+loaded Sort-Tile-Recursive with :data:`FANOUT` children per node, and
+searches it one level at a time with NumPy. It answers which envelopes
+contain a set of planned conditions, and which overlap them, visiting only
+the branches whose bounding boxes could qualify. The registry builds it at
+load (see :attr:`registry.Registry.envelope`), so it is cached on disk
+along with the other indexes.
+"""
+import math
+
+import numpy as np
+
+# Children per R-tree node
+FANOUT = 16
+
+_PAIR_WORDS = ('range', 'window')
+
+
+def _number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _pair(value):
+    return isinstance(value, (list, tuple)) and len(value) == 2 and all(_number(v) for v in value)
+
+
+def axis_of(name, pair=False):
+    """``(axis, end)`` for operating limit ``name``, where ``end`` is
+    ``'low'``, ``'high'``, ``'both'`` (a ``[low, high]`` pair, if ``pair``)
+    or ``'point'``."""
+    if pair:
+        return '_'.join(part for part in name.split('_') if part not in _PAIR_WORDS), 'both'
+    if name.startswith('min_'):
+        return name[len('min_'):], 'low'
+    if name.startswith('max_'):
+        return name[len('max_'):], 'high'
+    return name, 'point'
+
+
+def envelopes(cells, names, defaults=None):
+    """``(axes, lows, highs)`` for the operating limits ``names`` of ``cells``.
+
+    ``lows`` and ``highs`` are rows x axes arrays; open ends are infinite
+    and unknown axes NaN. ``defaults`` maps limit names to the value
+    assumed for cells that leave them unstated. Limits that are neither
+    numbers nor ``[low, high]`` pairs (e.g. flags) are left out.
+    """
+    defaults = defaults or {}
+    ends = {}  # axis -> (lows, highs)
+    for name in names:
+        values = [c.limit(name, defaults.get(name)) for c in cells]
+        stated = [v for v in values if v is not None]
+        if not stated:
+            continue
+        if all(_pair(v) for v in stated):
+            axis, end = axis_of(name, pair=True)
+        elif all(_number(v) for v in stated):
+            axis, end = axis_of(name)
+        else:
+            continue
+        lows, highs = ends.setdefault(axis, (np.full(len(cells), np.nan), np.full(len(cells), np.nan)))
+        for row, value in enumerate(values):
+            if value is None:
+                continue
+            low, high = value if end == 'both' else (value, value)
+            if end != 'high':
+                lows[row] = low
+            if end != 'low':
+                highs[row] = high
+
+    axes = tuple(sorted(ends))
+    shape = (len(cells), len(axes))
+    lows = np.column_stack([ends[axis][0] for axis in axes]) if axes else np.empty(shape)
+    highs = np.column_stack([ends[axis][1] for axis in axes]) if axes else np.empty(shape)
+    # An axis stated at one end only is open at the other
+    known = ~(np.isnan(lows) & np.isnan(highs))
+    lows[known & np.isnan(lows)] = -np.inf
+    highs[known & np.isnan(highs)] = np.inf
+    return axes, lows, highs
+
+
+def _str_order(centers, rows, axis=0):
+    """``rows`` in Sort-Tile-Recursive order: sorted along ``axis`` into
+    slabs of whole leaves, each slab ordered on the remaining axes."""
+    rows = rows[np.argsort(centers[rows, axis], kind='stable')]
+    n_axes = centers.shape[1]
+    if axis == n_axes - 1 or len(rows) <= FANOUT:
+        return rows
+    leaves = math.ceil(len(rows) / FANOUT)
+    slab = math.ceil(leaves / math.ceil(leaves ** (1 / (n_axes - axis)))) * FANOUT
+    return np.concatenate([
+        _str_order(centers, rows[start:start + slab], axis + 1) for start in range(0, len(rows), slab)
+    ])
+
+
+class EnvelopeIndex:
+    """Static R-tree over per-row envelopes (boxes with one axis per quantity).
+
+    ``order`` lists the rows in leaf order, and ``levels`` holds the
+    ``(lows, highs)`` boxes of each level, rows first and the root's
+    children last; node ``i`` of a level covers entries
+    ``i * FANOUT`` to ``(i + 1) * FANOUT`` of the level below.
+    """
+
+    def __init__(self, axes, lows, highs):
+        self.axes = tuple(axes)
+        self.positions = {axis: i for i, axis in enumerate(self.axes)}
+        self.n_rows = len(lows)
+        lows = np.asarray(lows, dtype=float).reshape(self.n_rows, len(self.axes))
+        highs = np.asarray(highs, dtype=float).reshape(self.n_rows, len(self.axes))
+
+        # Leaves are packed by box centre, or the finite end of a half-open
+        # box; rows unknown on an axis (NaN) sort last
+        with np.errstate(invalid='ignore'):
+            centers = (lows + highs) / 2
+        centers = np.where(np.isinf(lows), highs, np.where(np.isinf(highs), lows, centers))
+        centers[np.isinf(centers)] = 0
+        self.order = _str_order(centers, np.arange(self.n_rows)) if self.axes else np.arange(self.n_rows)
+
+        # np.fmin/fmax skip NaN, so a node is unknown only if all its children are
+        self.levels = [(lows[self.order], highs[self.order])]
+        while len(self.levels[-1][0]) > FANOUT:
+            child_lows, child_highs = self.levels[-1]
+            starts = np.arange(0, len(child_lows), FANOUT)
+            self.levels.append((np.fmin.reduceat(child_lows, starts, axis=0),
+                                np.fmax.reduceat(child_highs, starts, axis=0)))
+
+    @classmethod
+    def build(cls, cells, names, defaults=None):
+        """The index over the envelopes of ``cells`` (see :func:`envelopes`)."""
+        return cls(*envelopes(cells, names, defaults))
+
+    def arrays(self):
+        """Every array the index holds, e.g. to freeze them."""
+        return [self.order, *(array for level in self.levels for array in level)]
+
+    def by_row(self):
+        """``(lows, highs)``: the envelopes in row order, as rows x axes arrays."""
+        lows, highs = np.empty_like(self.levels[0][0]), np.empty_like(self.levels[0][1])
+        lows[self.order], highs[self.order] = self.levels[0]
+        return lows, highs
+
+    def bounds(self, axis):
+        """``(min, max)`` of the finite ends on ``axis``, or ``None`` if there are none."""
+        column = self.positions[axis]
+        ends = np.concatenate([self.levels[0][0][:, column], self.levels[0][1][:, column]])
+        ends = ends[np.isfinite(ends)]
+        if not len(ends):
+            return None
+        return ends.min(), ends.max()
+
+    def _search(self, conditions, contains):
+        # Both queries keep the rows with low <= upper and high >= lower on
+        # every queried axis. A containing envelope starts below the planned
+        # low and ends above the planned high; an overlapping one starts
+        # below the planned high and ends above the planned low. A node
+        # whose bounding box fails cannot hold a row that passes.
+        mask = np.zeros(self.n_rows, dtype=bool)
+        if not conditions:
+            mask[:] = True
+            return mask
+        columns, upper, lower = [], [], []
+        for axis, (low, high) in conditions.items():
+            columns.append(self.positions[axis])
+            if contains:
+                low, high = high, low
+            upper.append(np.inf if high is None else high)
+            lower.append(-np.inf if low is None else low)
+        upper, lower = np.array(upper, dtype=float), np.array(lower, dtype=float)
+
+        nodes = np.arange(len(self.levels[-1][0]))
+        for depth in range(len(self.levels) - 1, -1, -1):
+            lows, highs = self.levels[depth]
+            hit = ((lows[nodes][:, columns] <= upper) & (highs[nodes][:, columns] >= lower)).all(axis=1)
+            nodes = nodes[hit]
+            if depth:
+                nodes = (nodes[:, None] * FANOUT + np.arange(FANOUT)).ravel()
+                nodes = nodes[nodes < len(self.levels[depth - 1][0])]
+        mask[self.order[nodes]] = True
+        return mask
+
+    def containing(self, conditions):
+        """Boolean row mask of envelopes containing ``conditions``.
+
+        ``conditions`` maps axes to inclusive ``(low, high)`` planned
+        ranges (``low == high`` for a single value); an open end is not
+        constrained. Rows unknown on a queried axis never match.
+        """
+        return self._search(conditions, contains=True)
+
+    def overlapping(self, conditions):
+        """Boolean row mask of envelopes overlapping ``conditions``, as for
+        :meth:`containing`."""
+        return self._search(conditions, contains=False)
@@ -0,0 +1,181 @@
+"""Streaming export of registry subsets.
+
+Exports are generated only on demand and written in chunks of rows, so a
+large filtered subset never exists as one Python string. Each writer yields
+``bytes`` chunks; :func:`spool` collects them into a file-like object.
+
+The subset is a boolean row mask or a collection of cell ids.
+"""
+import io
+import json
+import tempfile
+import weakref
+
+import numpy as np
+import pandas as pd
+
+import registry
+
+CHUNK_ROWS = 2000
+
+# Spooled exports stay in memory up to this size, then move to disk
+SPOOL_MAX_BYTES = 16 * 1024 * 1024
+
+
+def resolve_rows(reg, selection):
+    """Row positions for a boolean mask or an iterable of cell ids."""
+    if isinstance(selection, np.ndarray) and selection.dtype == bool:
+        return np.flatnonzero(selection)
+    return np.array(sorted(reg.row_by_id[i] for i in selection if i in reg.row_by_id), dtype=np.intp)
+
+
+def _chunks(rows):
+    for start in range(0, len(rows), CHUNK_ROWS):
+        yield rows[start:start + CHUNK_ROWS]
+
+
+def iter_json(reg, rows):
+    """Pretty-printed JSON array, byte-identical to ``json.dumps(..., indent=2)``."""
+    if not len(rows):
+        yield b'[]'
+        return
+    yield b'[\n'
+    first = True
+    for chunk in _chunks(rows):
+        parts = []
+        for i in chunk:
+            text = json.dumps(reg.cells[i].to_record(), indent=2)
+            parts.append(('  ' if first else ',\n  ') + text.replace('\n', '\n  '))
+            first = False
+        yield ''.join(parts).encode('utf-8')
+    yield b'\n]'
+
+
+def iter_ndjson(reg, rows):
+    """One compact JSON record per line."""
+    for chunk in _chunks(rows):
+        yield ''.join(json.dumps(reg.cells[i].to_record()) + '\n' for i in chunk).encode('utf-8')
+
+
+def _cell_frame(reg, chunk):
+    # Straight from the cells: exports must not fill the shared registry's
+    # column cache with every column
+    return pd.DataFrame({name: pd.Series([reg.cells[i].flat(name) for i in chunk], dtype=object)
+                         for name in reg.columns})
+
+
+def _flat_chunk(reg, chunk):
+    """Flattened rows of ``chunk`` with list cells joined for CSV."""
+    frame = _cell_frame(reg, chunk)
+    joined = {
+        column: frame[column].map(
+            lambda v: '; '.join(map(str, v)) if isinstance(v, (list, tuple, np.ndarray)) else v)
+        for column in frame.columns
+    }
+    return frame.assign(**joined)
+
+
+def iter_csv(reg, rows):
+    """Flattened columns as CSV; list fields are joined with '; '."""
+    if not len(rows):
+        yield _flat_chunk(reg, rows).to_csv(index=False).encode('utf-8')
+        return
+    for n, chunk in enumerate(_chunks(rows)):
+        yield _flat_chunk(reg, chunk).to_csv(index=False, header=n == 0).encode('utf-8')
+
+
+def _arrow_type(pa, values):
+    """Arrow type of the stated ``values``: bool, float64 for numbers, a list
+    typed from all its items, or string, also when the values disagree."""
+    kinds, items = set(), []
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            kinds.add('bool')
+        elif isinstance(value, (int, float)):
+            kinds.add('number')
+        elif isinstance(value, (list, tuple)):
+            kinds.add('list')
+            items.extend(value)
+        else:
+            kinds.add('string')
+    if kinds == {'bool'}:
+        return pa.bool_()
+    if kinds == {'number'}:
+        return pa.float64()
+    if kinds == {'list'}:
+        return pa.list_(_arrow_type(pa, items))
+    return pa.string()
+
+
+_SCHEMAS = weakref.WeakKeyDictionary()
+
+
+def parquet_schema(reg):
+    """Arrow schema of the flattened columns, typed from every stated value
+    (numbers as float64, lists as lists, mixed columns as strings) without
+    building any column for the whole registry. Kept per registry."""
+    import pyarrow as pa
+
+    if reg not in _SCHEMAS:
+        _SCHEMAS[reg] = pa.schema([
+            pa.field(name, _arrow_type(pa, (c.flat(name) for c in reg.cells))) for name in reg.columns
+        ])
+    return _SCHEMAS[reg]
+
+
+def _conform(value, arrow_type, pa):
+    """``value`` as ``arrow_type`` holds it: text in string columns, as in CSV."""
+    if value is None:
+        return None
+    if pa.types.is_list(arrow_type):
+        return [_conform(v, arrow_type.value_type, pa) for v in value]
+    if pa.types.is_string(arrow_type) and not isinstance(value, str):
+        return '; '.join(map(str, value)) if isinstance(value, (list, tuple)) else str(value)
+    return value
+
+
+def _parquet_chunk(reg, chunk, schema):
+    import pyarrow as pa
+
+    return pa.table({
+        field.name: pa.array([_conform(reg.cells[i].flat(field.name), field.type, pa) for i in chunk], field.type)
+        for field in schema
+    }, schema=schema)
+
+
+def iter_parquet(reg, rows):
+    """Flattened columns as Parquet, one row group per chunk (needs pyarrow)."""
+    import pyarrow.parquet as pq
+
+    buffer = io.BytesIO()
+    schema = parquet_schema(reg)
+    with pq.ParquetWriter(buffer, schema) as writer:
+        for chunk in _chunks(rows):
+            writer.write_table(_parquet_chunk(reg, chunk, schema))
+            # Hand over what has been written so far and start a new buffer
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+# label -> (file extension, MIME type, writer)
+FORMATS = {
+    'JSON': ('json', 'application/json', iter_json),
+    'NDJSON': ('ndjson', 'application/x-ndjson', iter_ndjson),
+    'CSV': ('csv', 'text/csv', iter_csv),
+}
+if registry.pa is not None:
+    FORMATS['Parquet'] = ('parquet', 'application/vnd.apache.parquet', iter_parquet)
+
+
+def spool(reg, selection, fmt='JSON'):
+    """Write the export for ``selection`` to a rewound file-like object."""
+    _, _, writer = FORMATS[fmt]
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    for piece in writer(reg, resolve_rows(reg, selection)):
+        out.write(piece)
+    out.seek(0)
+    return out
@@ -0,0 +1,134 @@
+"""The technique glossary, and resolution of registry technique names against it.
+
+Registry entries name techniques loosely ("Hard X-ray XAS (Fluorescence)",
+"XRD-CT"), so each name is resolved to the glossary term it contains. The
+longest term found wins, so "XRD-CT" resolves to XRD-CT rather than XRD
+and "NEXAFS" to NEXAFS rather than EXAFS. :class:`Matcher` finds it with
+an Aho-Corasick automaton over every glossary term in one pass over the
+name. The registry resolves its technique vocabulary once at load (see
+:func:`resolve`), so nothing is scanned per rerun.
+
+The resolved term is a name's canonical technique; names matching no term
+are canonical as they are. :data:`TAXONOMY` places canonical techniques
+under broader ones, so filtering on XAS also finds XANES and EXAFS cells
+(see :func:`families`).
+"""
+import collections
+
+# Technique Glossary
+TECHNIQUE_DEFINITIONS = {
+    "Neutron Diffraction": "Sensitive to light elements (Li, O) and isotopes. Used to determine long-range crystal structure and phase evolution.",
+    "Muon spectroscopy": "A sensitive local probe (μ+SR) used to quantify ion diffusion rates (Li+, Na+) and pathways at the atomic scale.",
+    "Muon Elemental Analysis": "Uses negative muons (μ-SR/μXES) to probe elemental composition far below the surface without destruction.",
+    "SANS": "Small Angle Neutron Scattering. Probes nanoscale structures (1–100 nm), such as porosity, SEI formation, and particle morphology.",
+    "XPDF": "X-ray Pair Distribution Function. Probes local structure in disordered/amorphous materials (e.g., electrolytes).",
+    "XAS": "X-ray Absorption Spectroscopy. Probes oxidation states, bond lengths, and local coordination geometry.",
+    "XRS": "X-ray Raman Scattering. Provides electronic structure information using hard X-rays; suitable for bulk measurements.",
+    "Soft XPS": "X-ray Photoelectron Spectroscopy. Surface-sensitive (<10 nm) analysis of elemental composition and SEI chemistry.",
+    "AP-XPS": "Ambient Pressure XPS. Allows surface analysis at realistic pressures (solid-gas/solid-liquid interfaces), bridging the pressure gap.",
+    "NEXAFS": "Near-Edge X-ray Absorption Fine Structure. Probes electronic structure of light elements at surfaces.",
+    "Nano-focus XRF": "X-ray Fluorescence microscopy. Maps elemental distribution with nanoscale resolution.",
+    "XANES": "X-ray Absorption Near Edge Structure. Determines oxidation state and local symmetry.",
+    "Imaging": "Visualises macroscopic features like dendrites, gas evolution, and particle cracking (2D/3D).",
+    "XRD": "X-ray Diffraction. Determines crystal structure, lattice parameters, strain, and phase evolution during cycling.",
+    "XRD-CT": "X-ray Diffraction Computed Tomography. Combines diffraction contrast with tomography to map phase distributions and strain fields in 3D.",
+    "DFXM": "Dark Field X-ray Microscopy. Allows high-resolution mapping of crystal orientation and strain within individual grains.",
+    "EXAFS": "Extended X-ray Absorption Fine Structure. Analyzes average local structure and coordination numbers in materials lacking long-range order.",
+    "RIXS": "Resonant Inelastic X-ray Scattering. Probes orbital states and charge transfer dynamics.",
+    "Neutron Total Scattering": "Characterises non-crystalline/disordered materials (e.g., liquids) using H/D isotopic substitution.",
+    "QENS": "Quasi-Elastic Neutron Scattering. Probes slow diffusional processes like Li-ion hopping.",
+    "INS": "Inelastic Neutron Scattering. Probes vibrational modes to investigate material dynamics.",
+    "Bragg Edge Imaging": "Maps crystal texture, phase distribution, and lattice strain in real space.",
+    "Ptychography": "High-resolution phase-contrast imaging for nanoscale morphology.",
+    "Neutron Reflectometry": "Measures thin films and buried interfaces."
+}
+
+# Parent of each glossary term that is a kind of a broader one
+TAXONOMY = {
+    "XANES": "XAS",
+    "EXAFS": "XAS",
+    "NEXAFS": "XANES",
+    "AP-XPS": "Soft XPS",
+    "XRD-CT": "XRD",
+    "Bragg Edge Imaging": "Imaging",
+    "DFXM": "Imaging",
+    "Ptychography": "Imaging",
+}
+
+
+class Matcher:
+    """Aho-Corasick automaton finding the longest of a set of terms in a text.
+
+    Matching is case-insensitive and by substring, as the glossary lookup
+    always was.
+    """
+
+    def __init__(self, terms):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [None]  # longest term ending at each node
+        for term in terms:
+            node = 0
+            for char in term.casefold():
+                if char not in self._goto[node]:
+                    self._goto[node][char] = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(None)
+                node = self._goto[node][char]
+            if self._out[node] is None:
+                self._out[node] = term
+
+        # Failure links breadth first; a node without a term of its own
+        # inherits the longest one ending at its failure node
+        queue = collections.deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0) if node else 0
+                if self._out[child] is None:
+                    self._out[child] = self._out[self._fail[child]]
+                queue.append(child)
+
+    def longest(self, text):
+        """The longest term occurring in ``text`` (the first, if several are
+        that long), or ``None``."""
+        node, best = 0, None
+        for char in text.casefold():
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            found = self._out[node]
+            if found is not None and (best is None or len(found) > len(best)):
+                best = found
+        return best
+
+
+_MATCHER = None
+
+
+def resolve(names):
+    """Map each technique name to the glossary term it resolves to, if any."""
+    global _MATCHER
+    if _MATCHER is None:
+        _MATCHER = Matcher(TECHNIQUE_DEFINITIONS)
+    return {name: term for name in names if (term := _MATCHER.longest(name)) is not None}
+
+
+def ancestors(term):
+    """``term`` followed by its ancestors in :data:`TAXONOMY`, nearest first."""
+    chain = [term]
+    while chain[-1] in TAXONOMY:
+        chain.append(TAXONOMY[chain[-1]])
+    return tuple(chain)
+
+
+def families(names):
+    """Map each technique name to its canonical technique and that
+    technique's ancestors, e.g. "Hard X-ray XAS (Fluorescence)" to
+    ``('XAS',)`` and "NEXAFS" to ``('NEXAFS', 'XANES', 'XAS')``."""
+    terms = resolve(names)
+    return {name: ancestors(terms.get(name, name)) for name in names}
@@ -0,0 +1,133 @@
+"""Streaming, parallel ingest of large or sharded registries.
+
+Besides the single JSON array, a registry may be:
+
+* an NDJSON file (``.ndjson`` or ``.jsonl``), one record per line, or
+* a directory of JSON shards (``*.json`` at any depth), each holding one
+  record or an array of records, read in sorted path order.
+
+These are read in batches that a process pool parses into
+:class:`cells.Cell` objects. Only a few batches per worker are in flight at
+once, so peak memory is bounded by the cells themselves rather than the
+size of the raw text, and parsing uses every core. Set the number of
+workers with ``OPERANDO_LOAD_WORKERS`` (default: one per CPU).
+
+Kept free of numpy and pandas so worker processes start quickly.
+"""
+import collections
+import concurrent.futures
+import itertools
+import json
+import multiprocessing
+import os
+
+from cells import Cell, Interner
+
+NDJSON_SUFFIXES = ('.ndjson', '.jsonl')
+
+# Records (NDJSON lines or shard files) handed to a worker at a time
+BATCH_SIZE = 5000
+
+WORKERS = int(os.environ.get('OPERANDO_LOAD_WORKERS', 0)) or os.cpu_count() or 1
+
+
+def is_streamed(path):
+    """Whether ``path`` is an NDJSON file or a shard directory."""
+    return os.path.isdir(path) or path.lower().endswith(NDJSON_SUFFIXES)
+
+
+def shard_paths(path):
+    """The JSON shards under directory ``path``, in sorted order."""
+    found = []
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        found += [os.path.join(root, name) for name in sorted(files) if name.endswith('.json')]
+    return found
+
+
+def _read_shard(path):
+    with open(path, 'r') as f:
+        data = json.load(f)
+    return data if isinstance(data, list) else [data]
+
+
+def iter_records(path):
+    """Yield the raw records of a registry in any layout, one at a time."""
+    if os.path.isdir(path):
+        for shard in shard_paths(path):
+            yield from _read_shard(shard)
+    elif path.lower().endswith(NDJSON_SUFFIXES):
+        with open(path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path, 'r') as f:
+            yield from json.load(f)
+
+
+# --- Worker side ---
+
+def _parse_lines(lines):
+    intern = Interner()
+    return [Cell.from_record(json.loads(line), intern) for line in lines]
+
+
+def _parse_shards(paths):
+    intern = Interner()
+    return [Cell.from_record(record, intern) for path in paths for record in _read_shard(path)]
+
+
+# --- Parent side ---
+
+def _batches(items, size=BATCH_SIZE):
+    items = iter(items)
+    while batch := list(itertools.islice(items, size)):
+        yield batch
+
+
+def _ndjson_lines(path):
+    with open(path, 'r') as f:
+        yield from (line for line in f if line.strip())
+
+
+def _imap(fn, batches, workers):
+    """``map(fn, batches)`` over a process pool, in order.
+
+    At most two batches per worker are queued, so a slow consumer holds
+    back the reader instead of letting raw text pile up. A single batch
+    or a single worker is parsed in-process.
+    """
+    batches = iter(batches)
+    head = list(itertools.islice(batches, 2))
+    batches = itertools.chain(head, batches)
+    if workers <= 1 or len(head) < 2:
+        yield from map(fn, batches)
+        return
+
+    # spawn, not fork: the dashboard process runs threads
+    context = multiprocessing.get_context('spawn')
+    with concurrent.futures.ProcessPoolExecutor(workers, mp_context=context) as pool:
+        pending = collections.deque()
+        for batch in batches:
+            pending.append(pool.submit(fn, batch))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def stream_cells(path, workers=None):
+    """Yield the cells of an NDJSON or sharded registry in registry order.
+
+    Cells built in the workers are re-interned here, so values shared
+    across batches are held once.
+    """
+    if os.path.isdir(path):
+        batches, parse = _batches(shard_paths(path)), _parse_shards
+    else:
+        batches, parse = _batches(_ndjson_lines(path)), _parse_lines
+    intern = Interner()
+    for cells in _imap(parse, batches, workers or WORKERS):
+        for cell in cells:
+            yield intern.share(cell)
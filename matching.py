@@ -0,0 +1,262 @@
+"""Ranked matching of experimental requirements against the registry.
+
+A requirement profile (a "spec") is a dict of any of:
+
+* ``techniques``: techniques the experiment needs; a cell scores the
+  fraction of them it supports. Names are resolved to canonical
+  techniques, so XAS is met by XANES and EXAFS cells too (see
+  :mod:`glossary`).
+* ``temperature_c``: the target temperature; met by cells whose
+  ``max_temp_c`` reaches it (ambient when unstated).
+* ``pressure_control``: ``True`` if the experiment needs pressure control.
+* ``sample_size``: the sample format, read like the registry's sample
+  sizes (see :mod:`sample_sizes`); a cell scores the fraction of the
+  stated dimensions its own size overlaps, so "18 mm diameter" meets an
+  "18mm diameter" cell. A text with no readable size is matched
+  case-insensitively against ``specifications.sample_size`` instead.
+* ``window_materials``: acceptable window materials; a cell scores the
+  fraction of its (distinct) window materials that are acceptable.
+* ``acceptable_risks``: 3R limitation phrases the experiment can live
+  with; a cell scores the fraction of its distinct limitation phrases,
+  across all three categories, that are acceptable.
+* ``weights``: relative weight per criterion (default 1 each).
+
+Every criterion scores in ``[0, 1]``, and a cell's score is the weighted
+mean over the criteria the spec states, so 1.0 means every requirement is
+met. Scores are computed as specs x cells NumPy arrays over the registry's
+indexes, with no per-cell Python. :func:`rank` ranks the cells for one
+profile with a per-criterion breakdown, for the dashboard.
+:func:`match_requirements` does the same for a batch of specs, for agents;
+the API serves it as ``POST /match``.
+"""
+import math
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+import glossary
+import sample_sizes
+
+CRITERIA = (
+    'techniques', 'temperature_c', 'pressure_control', 'sample_size',
+    'window_materials', 'acceptable_risks',
+)
+DEFAULT_WEIGHTS = dict.fromkeys(CRITERIA, 1.0)
+
+# Specs are scored in chunks so that each specs x cells array stays about
+# this many elements
+CHUNK_SCORES = 1 << 22
+
+DEFAULT_LIMIT = 10
+
+
+def _sample_key(value):
+    return value.strip().casefold() if isinstance(value, str) else None
+
+
+def _names(value):
+    return isinstance(value, (list, tuple)) and all(isinstance(v, str) for v in value)
+
+
+def _number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def check_spec(spec):
+    """Raise ``ValueError`` unless ``spec`` is a requirement spec."""
+    if not isinstance(spec, dict):
+        raise ValueError(f"A requirement spec is an object, not {spec!r}")
+    unknown = set(spec) - set(CRITERIA) - {'weights'}
+    if unknown:
+        raise ValueError(f"Unknown requirement(s) {', '.join(sorted(unknown))}; "
+                         f"choose from {', '.join(CRITERIA + ('weights',))}")
+    for name in ('techniques', 'window_materials', 'acceptable_risks'):
+        if not _names(spec.get(name) or ()):
+            raise ValueError(f"{name} must be a list of names, not {spec[name]!r}")
+    if spec.get('temperature_c') is not None and not _number(spec['temperature_c']):
+        raise ValueError(f"temperature_c must be a number, not {spec['temperature_c']!r}")
+    if not isinstance(spec.get('pressure_control', False), bool):
+        raise ValueError(f"pressure_control must be true or false, not {spec['pressure_control']!r}")
+    if not isinstance(spec.get('sample_size', ''), str):
+        raise ValueError(f"sample_size must be a string, not {spec['sample_size']!r}")
+    weights = spec.get('weights') or {}
+    if not isinstance(weights, dict) or not all(
+            name in CRITERIA and _number(w) and math.isfinite(w) and w >= 0 for name, w in weights.items()):
+        raise ValueError(f"weights must map criteria to finite non-negative numbers, not {weights!r}")
+    criteria = [name for name in CRITERIA if stated(spec, name)]
+    if criteria and not sum(weights.get(name, DEFAULT_WEIGHTS[name]) for name in criteria):
+        raise ValueError(f"weights must not all be zero for the stated criteria ({', '.join(criteria)})")
+
+
+def stated(spec, name):
+    """Whether ``spec`` states criterion ``name``."""
+    if name == 'techniques':
+        return bool(spec.get('techniques'))
+    if name == 'temperature_c':
+        return spec.get('temperature_c') is not None
+    if name == 'pressure_control':
+        return bool(spec.get('pressure_control'))
+    return name in spec
+
+
+class _Columns:
+    """The per-row arrays every spec is scored against."""
+
+    def __init__(self, reg):
+        self.n_rows = len(reg)
+        self.techniques = reg.technique_families
+        self.max_temp = reg.limits['max_temp_c'].by_row()
+        self.pressure_control = reg.pressure_control
+        self.sample_dims = reg.sample_dims
+        codes, sizes = pd.factorize(reg.column('specifications.sample_size'))
+        self.sample_codes = codes
+        self.sample_code_of = {}
+        for code, size in enumerate(sizes):
+            self.sample_code_of.setdefault(_sample_key(size), code)
+        self.lists = {
+            'window_materials': (reg.window_materials, reg.window_materials.sizes().astype(np.float32)),
+            'acceptable_risks': (reg.limitation_phrases, reg.limitation_phrases.sizes().astype(np.float32)),
+        }
+
+
+_COLUMNS = weakref.WeakKeyDictionary()
+_COLUMNS_LOCK = threading.Lock()
+
+
+def _columns(reg):
+    # Built once per registry, so that ranking costs only the scoring
+    with _COLUMNS_LOCK:
+        columns = _COLUMNS.get(reg)
+        if columns is None:
+            columns = _COLUMNS[reg] = _Columns(reg)
+        return columns
+
+
+def score_chunk(columns, specs):
+    """Per-criterion scores for ``specs``: a dict of specs x cells arrays in
+    ``[0, 1]`` (or vectors that broadcast to one)."""
+    scores = {}
+
+    # Techniques outside the vocabulary still count as required
+    names = {name for spec in specs for name in spec.get('techniques') or ()}
+    canonical = {name: chain[0] for name, chain in glossary.families(names).items()}
+    required = [{canonical[name] for name in spec.get('techniques') or ()} for spec in specs]
+    n_required = np.array([len(terms) for terms in required], dtype=np.float32)
+    scores['techniques'] = columns.techniques.overlaps(required) / np.maximum(n_required, 1)[:, None]
+
+    target = np.array([spec.get('temperature_c', np.nan) for spec in specs], dtype=float)
+    scores['temperature_c'] = columns.max_temp[None, :] >= target[:, None]
+
+    scores['pressure_control'] = columns.pressure_control[None, :]
+
+    # One overlap query per stated dimension; the text itself only when
+    # it gives no size
+    sample = np.zeros((len(specs), columns.n_rows), dtype=np.float32)
+    for i, spec in enumerate(specs):
+        if 'sample_size' not in spec:
+            continue
+        dimensions, _ = sample_sizes.parse(spec['sample_size'])
+        for name, (low, high) in dimensions.items():
+            sample[i] += columns.sample_dims[name].mask(low, high)
+        if dimensions:
+            sample[i] /= len(dimensions)
+        else:
+            sample[i] = columns.sample_codes == columns.sample_code_of.get(_sample_key(spec['sample_size']), -2)
+    scores['sample_size'] = sample
+
+    # Cells listing no windows (or no limitations) have nothing unacceptable
+    for name, (index, sizes) in columns.lists.items():
+        accepted = index.overlaps([set(spec.get(name) or ()) for spec in specs])
+        scores[name] = np.where(sizes > 0, accepted / np.maximum(sizes, 1), np.float32(1))
+    return scores
+
+
+def score(columns, specs):
+    """``(total, scores)``: specs x cells weighted scores, and the
+    per-criterion scores from :func:`score_chunk`."""
+    weights = np.array([
+        [stated(spec, name) * {**DEFAULT_WEIGHTS, **(spec.get('weights') or {})}[name] for name in CRITERIA]
+        for spec in specs
+    ], dtype=np.float32).reshape(len(specs), len(CRITERIA))
+    weight_sums = weights.sum(axis=1)
+    # A spec stating nothing is met by every cell
+    weights /= np.where(weight_sums > 0, weight_sums, 1)[:, None]
+    scores = score_chunk(columns, specs)
+    total = np.zeros((len(specs), columns.n_rows), dtype=np.float32)
+    total[weight_sums == 0] = 1
+    for i, name in enumerate(CRITERIA):
+        if weights[:, i].any():
+            total += weights[:, i, None] * scores[name]
+    return total, scores
+
+
+def top_rows(scores, limit):
+    """Row positions of the ``limit`` best positive ``scores``, best first;
+    ties keep registry order."""
+    if limit < len(scores):
+        kth = np.partition(scores, len(scores) - limit)[len(scores) - limit]
+        above = np.flatnonzero(scores > kth)
+        rows = np.concatenate([above, np.flatnonzero(scores == kth)[:limit - len(above)]])
+    else:
+        rows = np.arange(len(scores))
+    rows = rows[np.argsort(-scores[rows], kind='stable')]
+    return rows[scores[rows] > 0]
+
+
+def _ranked(reg, specs, limit, mask=None):
+    """Yield ``(rows, total, breakdown)`` per spec, where ``breakdown`` maps
+    each stated criterion to its scores for ``rows``."""
+    for spec in specs:
+        check_spec(spec)
+    if not specs:
+        return
+    columns = _columns(reg)
+    chunk = max(1, CHUNK_SCORES // max(len(reg), 1))
+    for start in range(0, len(specs), chunk):
+        batch = specs[start:start + chunk]
+        total, scores = score(columns, batch)
+        if mask is not None:
+            total[:, ~mask] = 0
+        for i, spec in enumerate(batch):
+            rows = top_rows(total[i], limit)
+            breakdown = {
+                name: np.broadcast_to(scores[name], total.shape)[i, rows]
+                for name in CRITERIA if stated(spec, name)
+            }
+            yield rows, total[i, rows], breakdown
+
+
+def rank(reg, profile, mask=None, limit=None):
+    """Cells ranked against requirement ``profile``, best first.
+
+    Returns a DataFrame of ``id``, ``name``, ``score`` and a score column
+    per stated criterion. Only cells under ``mask`` (all by default) that
+    meet some requirement are included.
+    """
+    rows, total, breakdown = next(_ranked(reg, [profile], limit or len(reg), mask))
+    return pd.DataFrame({
+        'id': reg.ids[rows], 'name': reg.names[rows], 'score': total,
+        **{name: values.astype(np.float32) for name, values in breakdown.items()},
+    })
+
+
+def match_requirements(reg, specs, limit=DEFAULT_LIMIT):
+    """Rank the registry's cells against each requirement spec.
+
+    Returns one list per spec, in order, of up to ``limit`` cells as
+    ``{'id', 'name', 'score', 'breakdown'}`` dicts, best first, where
+    ``breakdown`` holds the score of each criterion the spec states.
+    Cells meeting none of a spec's requirements are left out. Raises
+    ``ValueError`` for a malformed spec.
+    """
+    results = []
+    for rows, total, breakdown in _ranked(reg, specs, limit):
+        parts = {name: values.tolist() for name, values in breakdown.items()}
+        results.append([
+            {'id': reg.cells[row].id, 'name': reg.cells[row].name, 'score': round(float(total[j]), 4),
+             'breakdown': {name: round(float(values[j]), 4) for name, values in parts.items()}}
+            for j, row in enumerate(rows.tolist())
+        ])
+    return results
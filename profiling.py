@@ -0,0 +1,123 @@
+"""Opt-in per-stage timing for dashboard reruns.
+
+Enable it for every session with ``OPERANDO_PROFILE=1`` or for one session
+with the ``?debug=1`` query parameter. The dashboard calls
+:meth:`RerunProfile.lap` at the end of each numbered section, so every
+section is timed without re-indenting the script. Each finished rerun is
+appended as one JSON line to a rotating log (``OPERANDO_PROFILE_LOG``,
+default ``logs/rerun_timings.jsonl``) for scraping.
+
+Peak memory comes from :mod:`tracemalloc`, which traces only while at least
+one profiled rerun is running. It counts Python allocations across the whole
+process, so reruns profiled concurrently inflate each other's peaks. A rerun
+that never reaches :meth:`RerunProfile.finish` (interrupted by a newer
+rerun, or by ``st.stop()``) stops tracing when its profile is garbage
+collected, which happens as soon as the next script run replaces the old
+script module.
+"""
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+import tracemalloc
+import weakref
+
+LOG_PATH = os.environ.get('OPERANDO_PROFILE_LOG', os.path.join('logs', 'rerun_timings.jsonl'))
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3
+
+_tracing_lock = threading.Lock()
+_tracing_reruns = 0
+_logger = None
+
+
+def enabled_by_env():
+    return os.environ.get('OPERANDO_PROFILE', '').lower() in ('1', 'true', 'yes')
+
+
+def _rerun_logger():
+    global _logger
+    if _logger is None:
+        logger = logging.getLogger('operando.reruns')
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        os.makedirs(os.path.dirname(LOG_PATH) or '.', exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(
+            LOG_PATH, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        _logger = logger
+    return _logger
+
+
+def _start_tracing():
+    global _tracing_reruns
+    with _tracing_lock:
+        if _tracing_reruns == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracing_reruns += 1
+
+
+def _stop_tracing():
+    global _tracing_reruns
+    with _tracing_lock:
+        _tracing_reruns -= 1
+        if _tracing_reruns == 0:
+            tracemalloc.stop()
+
+
+class RerunProfile:
+    """Stage timings and peak memory for one script run.
+
+    A disabled profile accepts the same calls and records nothing.
+    """
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.stages = []
+        self.total_s = 0.0
+        self.peak_bytes = 0
+        self._finished = False
+        if enabled:
+            _start_tracing()
+            # Runs at most once: on finish, or when an abandoned profile is collected
+            self._stop_tracing = weakref.finalize(self, _stop_tracing)
+            tracemalloc.reset_peak()
+            self._started = self._lap_started = time.perf_counter()
+
+    def lap(self, stage):
+        """Close ``stage``: everything since the previous lap is charged to it."""
+        if not self.enabled or self._finished:
+            return
+        now = time.perf_counter()
+        _, peak = tracemalloc.get_traced_memory()
+        self.stages.append({'stage': stage, 'seconds': now - self._lap_started, 'peak_bytes': peak})
+        self.peak_bytes = max(self.peak_bytes, peak)
+        tracemalloc.reset_peak()
+        self._lap_started = now
+
+    def finish(self, **fields):
+        """Stop tracing and append the rerun to the rolling log.
+
+        Extra ``fields`` (e.g. the visible row count) are logged alongside.
+        """
+        if not self.enabled or self._finished:
+            return
+        self._finished = True
+        self.total_s = time.perf_counter() - self._started
+        self._stop_tracing()
+        entry = {
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'total_s': self.total_s,
+            'peak_bytes': self.peak_bytes,
+            'stages': {s['stage']: {'seconds': s['seconds'], 'peak_bytes': s['peak_bytes']}
+                       for s in self.stages},
+            **fields,
+        }
+        try:
+            _rerun_logger().info(json.dumps(entry))
+        except OSError:
+            pass  # an unwritable log must not break the page
@@ -0,0 +1,206 @@
+"""Pluggable query backends behind the dashboard's filter logic.
+
+Every backend is built over the shared :class:`registry.Registry`. Each one
+answers ``filter(**filters)`` with a boolean row mask over it and
+``facet_counts(facet, **filters)`` with per-term counts. Both take the
+same keyword arguments as :meth:`registry.Registry.filter`. Select one with
+``OPERANDO_QUERY_BACKEND``:
+
+* ``memory`` (default): the registry's own bitmap and sorted indexes.
+* ``sqlite``: predicates pushed down to the indexed store in
+  :mod:`sqlite_store`.
+* ``duckdb``: the whole sidebar state compiled into one DuckDB query over
+  the normalized registry (loaded through Arrow), using native list
+  functions for the technique and instrument facets. It also runs ad-hoc
+  SQL through :meth:`DuckDBBackend.sql`. Needs ``pip install duckdb``.
+"""
+import os
+import threading
+
+import numpy as np
+
+import registry
+import sqlite_store
+
+DEFAULT_BACKEND = os.environ.get('OPERANDO_QUERY_BACKEND', 'memory')
+
+
+class MemoryBackend:
+    """The registry's in-memory indexes."""
+
+    def __init__(self, reg):
+        self.reg = reg
+        self.filter = reg.filter
+        self.facet_counts = reg.facet_counts
+
+
+class SQLiteBackend:
+    """Filters evaluated in the SQLite store, mapped back to registry rows.
+
+    The store has no technique taxonomy, parsed sample sizes or operating
+    envelopes, so ``technique_families``, ``sample_ranges`` and the
+    envelope queries are applied with the registry's own indexes.
+    """
+
+    def __init__(self, reg, path=None):
+        self.reg = reg
+        self.store = sqlite_store.SQLiteRegistry(path or sqlite_store.DB_PATH)
+        self.store.sync(reg.source or registry.REGISTRY_PATH)
+
+    # Filters the store cannot evaluate
+    REGISTRY_FILTERS = ('technique_families', 'sample_ranges', 'envelope_contains', 'envelope_overlaps')
+
+    def filter(self, **filters):
+        registry_filters = {name: filters.pop(name, None) for name in self.REGISTRY_FILTERS}
+        mask = self.reg.mask_of(self.store.filter_ids(**filters))
+        if any(registry_filters.values()):
+            mask &= self.reg.filter(**registry_filters)
+        return mask
+
+    def facet_counts(self, facet, **filters):
+        if facet != 'technique_families' and not any(filters.get(name) for name in self.REGISTRY_FILTERS):
+            for name in self.REGISTRY_FILTERS:
+                filters.pop(name, None)
+            return self.store.facet_counts(facet, **filters)
+        index = getattr(self.reg, facet)
+        return dict(zip(index.terms, index.counts(self.filter(**{**filters, facet: ()})).tolist()))
+
+
+class DuckDBBackend:
+    """Filters compiled to a single DuckDB query over the normalized registry.
+
+    The table ``cells`` has one row per registry row (``row``), the
+    ``techniques``, ``instruments`` and ``technique_families`` lists (the
+    last with every taxonomy ancestor included), the ``cad_available`` and
+    ``pressure_control`` flags, a column per indexed operating limit (NULL
+    where unknown), and ``<dimension>_low`` and ``<dimension>_high`` columns
+    per parsed sample dimension and ``envelope_<axis>_low`` and
+    ``envelope_<axis>_high`` per operating envelope axis (NULL where
+    unknown, infinite where open).
+    """
+
+    def __init__(self, reg):
+        import duckdb
+        import pyarrow as pa
+
+        self.reg = reg
+        strings = pa.list_(pa.string())
+        columns = {
+            'row': np.arange(len(reg), dtype=np.int64),
+            'techniques': pa.array([c.techniques for c in reg.cells], strings),
+            'instruments': pa.array([c.instruments for c in reg.cells], strings),
+            'technique_families': pa.array([
+                list(dict.fromkeys(f for t in c.techniques for f in reg.technique_closure[t])) for c in reg.cells
+            ], strings),
+            'cad_available': reg.cad_available,
+            'pressure_control': reg.pressure_control,
+        }
+        # NaN compares above every number in DuckDB; unknowns go in as NULL
+        for name, index in reg.limits.items():
+            columns[name] = pa.array(index.by_row(), from_pandas=True)
+        for name, index in reg.sample_dims.items():
+            columns[f'{name}_low'] = pa.array(index.lows.by_row(), from_pandas=True)
+            columns[f'{name}_high'] = pa.array(index.highs.by_row(), from_pandas=True)
+        lows, highs = reg.envelope.by_row()
+        for axis, column in reg.envelope.positions.items():
+            columns[f'envelope_{axis}_low'] = pa.array(lows[:, column], from_pandas=True)
+            columns[f'envelope_{axis}_high'] = pa.array(highs[:, column], from_pandas=True)
+        table = pa.table(columns)
+
+        # Materialised as a DuckDB table: views registered from Python
+        # objects are not visible to the per-thread cursors
+        self._conn = duckdb.connect()
+        self._conn.register('cells_arrow', table)
+        self._conn.execute('CREATE TABLE cells AS SELECT * FROM cells_arrow')
+        self._conn.unregister('cells_arrow')
+        self._local = threading.local()
+
+    def _cursor(self):
+        # DuckDB connections are not thread-safe; each script thread gets its own cursor
+        if not hasattr(self._local, 'cursor'):
+            self._local.cursor = self._conn.cursor()
+        return self._local.cursor
+
+    def _where(self, techniques=(), instruments=(), cad_only=False, pressure_only=False,
+               high_temp_only=False, limit_ranges=None, technique_families=(), sample_ranges=None,
+               envelope_contains=None, envelope_overlaps=None):
+        clauses, params = [], []
+        for column, selected in (('techniques', techniques), ('instruments', instruments),
+                                 ('technique_families', technique_families)):
+            if selected:
+                clauses.append(f"list_has_any({column}, ?::VARCHAR[])")
+                params.append(list(selected))
+        if cad_only:
+            clauses.append('cad_available')
+        if pressure_only:
+            clauses.append('pressure_control')
+        if high_temp_only:
+            clauses.append('max_temp_c >= ?')
+            params.append(registry.HIGH_TEMP_C)
+        for name, (low, high) in (limit_ranges or {}).items():
+            if name not in self.reg.limits:
+                raise KeyError(f"Unknown operating limit: {name!r}")
+            # As in the registry's sorted index, even an open range needs a known value
+            clauses.append(f'"{name}" IS NOT NULL')
+            if low is not None:
+                clauses.append(f'"{name}" >= ?')
+                params.append(low)
+            if high is not None:
+                clauses.append(f'"{name}" <= ?')
+                params.append(high)
+        for name, (low, high) in (sample_ranges or {}).items():
+            if name not in self.reg.sample_dims:
+                raise KeyError(f"Unknown sample dimension: {name!r}")
+            # Overlap with [low, high]; an open range still needs a known size
+            clauses.append(f'"{name}_low" IS NOT NULL')
+            if high is not None:
+                clauses.append(f'"{name}_low" <= ?')
+                params.append(high)
+            if low is not None:
+                clauses.append(f'"{name}_high" >= ?')
+                params.append(low)
+        # As in envelopes.EnvelopeIndex: a containing envelope starts below
+        # the planned low and ends above the planned high, an overlapping
+        # one starts below the planned high and ends above the planned low
+        for conditions, contains in ((envelope_contains, True), (envelope_overlaps, False)):
+            for axis, (low, high) in (conditions or {}).items():
+                if axis not in self.reg.envelope.positions:
+                    raise KeyError(f"Unknown envelope axis: {axis!r}")
+                upper, lower = (low, high) if contains else (high, low)
+                clauses.append(f'"envelope_{axis}_low" <= ? AND "envelope_{axis}_high" >= ?')
+                params += [np.inf if upper is None else upper, -np.inf if lower is None else lower]
+        return ' AND '.join(clauses) or 'TRUE', params
+
+    def filter(self, **filters):
+        where, params = self._where(**filters)
+        rows = self._cursor().execute(f"SELECT row FROM cells WHERE {where}", params).fetchnumpy()['row']
+        mask = np.zeros(len(self.reg), dtype=bool)
+        mask[rows] = True
+        return mask
+
+    def facet_counts(self, facet, **filters):
+        where, params = self._where(**{**filters, facet: ()})
+        counts = dict(self._cursor().execute(
+            f"SELECT term, count(*) FROM (SELECT unnest(list_distinct({facet})) AS term "
+            f"FROM cells WHERE {where}) GROUP BY term", params).fetchall())
+        return {term: counts.get(term, 0) for term in getattr(self.reg, facet).terms}
+
+    def sql(self, query, params=None):
+        """Run an ad-hoc query against the ``cells`` table as a DataFrame."""
+        return self._cursor().execute(query, params or []).df()
+
+
+BACKENDS = {
+    'memory': MemoryBackend,
+    'sqlite': SQLiteBackend,
+    'duckdb': DuckDBBackend,
+}
+
+
+def make_backend(reg, name=DEFAULT_BACKEND):
+    """Build the query backend called ``name`` over ``reg``."""
+    try:
+        backend = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown query backend {name!r}; choose from {', '.join(BACKENDS)}") from None
+    return backend(reg)
@@ -0,0 +1,967 @@
+"""Loading and indexing for the operando cell registry.
+
+Kept free of Streamlit so the dashboard, scripts and services can share it.
+The dashboard holds a single :class:`Registry` per process and expresses
+every filter as a boolean mask over its rows, so sessions never copy the
+table.
+
+Each cell is held once, as a slotted :class:`cells.Cell`; flattened
+(``json_normalize``-style) columns are built on demand, and only for the
+rows a caller asks for.
+
+List-valued columns such as ``compatibility.techniques`` are served from
+inverted indexes (:class:`FacetIndex`) built once at load time, so a filter
+is a bitmap OR over the selected terms rather than a Python scan of every
+row.
+
+The registry is a JSON array, an NDJSON file or a directory of JSON shards;
+the latter two are parsed incrementally across a process pool by
+:mod:`ingest`. Set ``OPERANDO_REGISTRY_PATH`` to load one of them instead
+of ``operando_cell_registry.json``, or to several joined with
+``os.pathsep`` (e.g. one per facility), which :func:`load_sources` loads
+concurrently and merges by cell id.
+
+Cold start is dominated by parsing the registry. To avoid paying that on
+every start, a columnar Feather snapshot of the cells is written next to
+the registry, keyed by its content hash and the snapshot layout version;
+each source of a federated registry gets its own. On top of that, the
+whole :class:`Registry`, indexes included, is cached on disk
+(:func:`write_cache`), so a restarted process skips parsing and indexing
+altogether. Build both with::
+
+    python registry.py [source ...]
+"""
+import concurrent.futures
+import contextlib
+import gc
+import glob
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+
+import envelopes
+import glossary
+import ingest
+import sample_sizes
+from cells import LIMITS_PREFIX, Cell, Interner, flat_columns
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.feather as feather
+except ImportError:  # the snapshot is an optional speed-up
+    pa = None
+
+SNAPSHOT_ERRORS = (OSError, ValueError, pa.ArrowException) if pa is not None else (OSError, ValueError)
+
+log = logging.getLogger('operando.registry')
+
+
+def registry_sources(value):
+    """One registry path, or a list of them when ``value`` joins several
+    with ``os.pathsep``."""
+    sources = [source for source in value.split(os.pathsep) if source]
+    return sources[0] if len(sources) == 1 else sources
+
+
+REGISTRY_PATH = registry_sources(os.environ.get('OPERANDO_REGISTRY_PATH', 'operando_cell_registry.json'))
+
+# Bumped whenever the snapshot columns change, so old snapshots are rebuilt
+SNAPSHOT_VERSION = 2
+
+# Bumped whenever Registry, its indexes or Cell change shape, so older
+# registry caches are rebuilt rather than unpickled into the wrong layout
+CACHE_VERSION = 4
+
+CACHE_ERRORS = (OSError, EOFError, ValueError, TypeError, AttributeError, ImportError, pickle.PickleError)
+
+# Snapshots and registry caches go next to the registry unless this names
+# another directory, e.g. a volume that survives container restarts
+CACHE_DIR = os.environ.get('OPERANDO_CACHE_DIR')
+
+# Threshold for the "High Temperature" filter and metric
+HIGH_TEMP_C = 100
+
+# Values assumed for cells that leave an operating limit unstated; limits
+# not listed here are unknown and such cells never match a range on them
+LIMIT_DEFAULTS = {'max_temp_c': 25}
+
+_COMPACT = (',', ':')
+
+
+def content_hash(path):
+    """SHA-256 hex digest of a file's bytes.
+
+    For a shard directory the digest covers each shard's path, size and
+    modification time instead, so checking it does not read every shard.
+    For a list of sources it covers each source's own digest.
+    """
+    digest = hashlib.sha256()
+    if isinstance(path, (list, tuple)):
+        for source in path:
+            digest.update(content_hash(source).encode())
+        return digest.hexdigest()
+    if os.path.isdir(path):
+        for shard in ingest.shard_paths(path):
+            stat = os.stat(shard)
+            digest.update(f"{os.path.relpath(shard, path)}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+        return digest.hexdigest()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_root(path):
+    """Path prefix shared by the snapshot and registry cache files of ``path``."""
+    if isinstance(path, (list, tuple)):
+        # Merges that share a first source must not collide, or each would
+        # remove the other's files as stale
+        sources = hashlib.sha256('\0'.join(os.path.abspath(source) for source in path).encode())
+        return f"{cache_root(path[0])}-merged-{sources.hexdigest()[:8]}"
+    root, _ = os.path.splitext(os.path.normpath(path))
+    if CACHE_DIR:
+        # Registries with the same file name in different directories must not collide
+        where = hashlib.sha256(os.path.abspath(root).encode()).hexdigest()[:8]
+        root = os.path.join(CACHE_DIR, f"{os.path.basename(root)}-{where}")
+    return root
+
+
+def _replace_stale(root, target, suffix):
+    """Remove files like ``target`` (same ``root`` and ``suffix``) but for
+    another content hash."""
+    for stale in glob.glob(f"{glob.escape(root)}.{'?' * 16}.*{suffix}"):
+        if stale != target:
+            os.remove(stale)
+
+
+def snapshot_path(path, digest):
+    """Where the snapshot of ``path`` with content hash ``digest`` lives."""
+    return f"{cache_root(path)}.{digest[:16]}.v{SNAPSHOT_VERSION}.feather"
+
+
+@contextlib.contextmanager
+def _paused_gc():
+    # Loads build one large acyclic object graph: collecting while it grows
+    # only costs time, as every pass walks all that was built so far
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if collecting:
+            gc.enable()
+
+
+def parse_registry(path, workers=None):
+    """Parse the registry into a list of cells the slow way.
+
+    NDJSON files and shard directories are streamed through
+    :func:`ingest.stream_cells` with up to ``workers`` processes.
+    """
+    if ingest.is_streamed(path):
+        return list(ingest.stream_cells(path, workers))
+    with _paused_gc():
+        with open(path, 'r') as f:
+            records = json.load(f)
+        intern = Interner()
+        return [Cell.from_record(record, intern) for record in records]
+
+
+def _snapshot_table(cells):
+    """The cells as an Arrow table, one column per :class:`cells.Cell` field.
+
+    Nested fields (operating limits, 3R limitations and the rare raw record)
+    are stored as compact JSON text.
+    """
+    strings = pa.list_(pa.string())
+    encoded = {}
+
+    def encode(value):
+        # Identical (interned) values are encoded once
+        key = id(value)
+        if key not in encoded:
+            encoded[key] = (value, json.dumps(value, separators=_COMPACT))
+        return encoded[key][1]
+
+    return pa.table({
+        'id': pa.array([c.id for c in cells], pa.string()),
+        'name': pa.array([c.name for c in cells], pa.string()),
+        'type': pa.array([c.type for c in cells], pa.string()),
+        'primary_email': pa.array([c.primary_email for c in cells], pa.string()),
+        'instruments': pa.array([c.instruments for c in cells], strings),
+        'techniques': pa.array([c.techniques for c in cells], strings),
+        'sample_size': pa.array([c.sample_size for c in cells], pa.string()),
+        'window_materials': pa.array([c.window_materials for c in cells], strings),
+        'operating_limits': pa.array([encode(c.operating_limits) for c in cells], pa.string()),
+        'limitations_3r': pa.array(
+            [None if c.limitations_3r is None else encode(c.limitations_3r) for c in cells],
+            pa.string()),
+        'cad_available': pa.array([c.cad_available for c in cells], pa.bool_()),
+        'keys': pa.array([c.keys for c in cells], strings),
+        'raw': pa.array(
+            [None if c.raw is None else json.dumps(c.raw, separators=_COMPACT) for c in cells],
+            pa.string()),
+    })
+
+
+def write_snapshot(path, cells, digest=None):
+    """Write the columnar snapshot for ``path`` and drop stale ones.
+
+    Returns the snapshot path, or ``None`` when pyarrow is unavailable.
+    """
+    if pa is None:
+        return None
+    digest = digest or content_hash(path)
+    target = snapshot_path(path, digest)
+    table = _snapshot_table(cells)
+    os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+    # Write to a temporary name first so a concurrent reader never maps a
+    # half-written file.
+    tmp = f"{target}.{os.getpid()}.tmp"
+    feather.write_feather(table, tmp, compression='uncompressed')
+    os.replace(tmp, target)
+    _replace_stale(cache_root(path), target, '.feather')
+    return target
+
+
+# Joins the items of a list column to tell identical lists apart; a column
+# with an item containing it is read row by row instead
+_LIST_SEPARATOR = '\x1f'
+
+
+def _take(uniques, indices):
+    """``uniques[i]`` for each of ``indices``, with ``None`` for null indices."""
+    values = np.empty(len(uniques) + 1, dtype=object)
+    for i, value in enumerate(uniques):
+        values[i] = value  # element by element, so tuples stay whole
+    return values[indices.fill_null(len(uniques)).to_numpy()].tolist()
+
+
+def _distinct_values(column, convert, json_text=False):
+    """``convert`` of each value of a string column, computed once per
+    distinct value; with ``json_text``, of each value parsed as JSON."""
+    encoded = column.combine_chunks().dictionary_encode()
+    uniques = encoded.dictionary.to_pylist()
+    if json_text:
+        # One parse for all of them
+        uniques = json.loads(f"[{','.join(uniques)}]")
+    return _take([convert(v) for v in uniques], encoded.indices)
+
+
+def _distinct_lists(column, convert):
+    """``convert`` of each list of a list-of-strings column, computed once per
+    distinct list."""
+    column = column.combine_chunks()
+    if pc.any(pc.match_substring(column.flatten(), _LIST_SEPARATOR)).as_py():
+        return [None if v is None else convert(v) for v in column.to_pylist()]
+    indices = pc.binary_join(column, _LIST_SEPARATOR).dictionary_encode().indices
+    # Dictionary entries are numbered in order of first occurrence
+    _, first = np.unique(indices.fill_null(-1).to_numpy(), return_index=True)
+    first = first[1:] if indices.null_count else first
+    return _take([convert(v) for v in column.take(first).to_pylist()], indices)
+
+
+def read_snapshot(target):
+    """Memory-map a snapshot back into a list of cells.
+
+    Repeated values (types, sample sizes, lists of names, operating limits
+    and 3R limitations) are converted once per distinct value rather than
+    once per row.
+    """
+    table = feather.read_table(target, memory_map=True)
+    intern = Interner()
+    column = table.column
+
+    def limitations(pairs):
+        return tuple([(intern(k), intern.strings(v)) for k, v in pairs])
+
+    with _paused_gc():
+        raw = [None if text is None else json.loads(text) for text in column('raw').to_pylist()]
+        return list(map(
+            Cell,
+            column('id').to_pylist(), column('name').to_pylist(),
+            _distinct_values(column('type'), intern), _distinct_values(column('primary_email'), intern),
+            _distinct_lists(column('instruments'), intern.strings),
+            _distinct_lists(column('techniques'), intern.strings),
+            _distinct_values(column('sample_size'), intern),
+            _distinct_lists(column('window_materials'), intern.strings),
+            _distinct_values(column('operating_limits'), intern.pairs, json_text=True),
+            _distinct_values(column('limitations_3r'), limitations, json_text=True),
+            column('cad_available').to_pylist(), _distinct_lists(column('keys'), intern.strings), raw,
+        ))
+
+
+def load_registry(path=REGISTRY_PATH, workers=None):
+    """Return the list of cells in the registry at ``path``.
+
+    Uses the snapshot when one matches the file's current content hash and
+    otherwise parses the JSON, refreshing the snapshot on the way (with up
+    to ``workers`` processes, see :func:`parse_registry`). ``path`` may
+    also be a list of sources, merged by :func:`load_sources`.
+    """
+    if isinstance(path, (list, tuple)):
+        return load_sources(path)[0]
+    digest = content_hash(path)
+    target = snapshot_path(path, digest)
+    if pa is not None and os.path.exists(target):
+        try:
+            return read_snapshot(target)
+        except SNAPSHOT_ERRORS:
+            pass  # unreadable snapshot: rebuild it below
+
+    cells = parse_registry(path, workers)
+    try:
+        write_snapshot(path, cells, digest)
+    except SNAPSHOT_ERRORS:
+        pass  # read-only deployments still work, just without the snapshot
+    return cells
+
+
+def cache_path(path, digest):
+    """Where the registry cache of ``path`` with content hash ``digest`` lives."""
+    return f"{cache_root(path)}.{digest[:16]}.v{CACHE_VERSION}.registry.pickle"
+
+
+_DERIVATION = None
+
+
+def derivation_hash():
+    """Hash of what the cached indexes are derived with besides the data.
+
+    Covers the thresholds and defaults baked into the indexes and the
+    source of every module that builds them, so editing any of them
+    invalidates the registry cache without a :data:`CACHE_VERSION` bump.
+    """
+    global _DERIVATION
+    if _DERIVATION is None:
+        h = hashlib.sha256(repr((HIGH_TEMP_C, sorted(LIMIT_DEFAULTS.items()))).encode())
+        for module in (sys.modules[__name__], sys.modules[Cell.__module__], ingest, sample_sizes, envelopes):
+            with open(module.__file__, 'rb') as f:
+                h.update(f.read())
+        _DERIVATION = h.hexdigest()[:16]
+    return _DERIVATION
+
+
+def _cache_header(digest):
+    return {'version': CACHE_VERSION, 'digest': digest, 'numpy': np.__version__,
+            'derivation': derivation_hash()}
+
+
+def write_cache(reg, path, digest):
+    """Persist ``reg`` with every derived index, for :func:`read_cache`.
+
+    The cache is a pickle of the whole registry behind a header naming the
+    cache version and the sources' content hash. It is only ever read back
+    from where this process wrote it, like the snapshot.
+    """
+    target = cache_path(path, digest)
+    os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        pickle.dump(_cache_header(digest), f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(reg, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, target)
+    _replace_stale(cache_root(path), target, '.registry.pickle')
+    return target
+
+
+def read_cache(path, digest):
+    """The cached :class:`Registry` for ``path`` at ``digest``, or ``None``.
+
+    A cache written by another cache version, numpy or derivation (see
+    :func:`derivation_hash`), or for other content, is a miss.
+    """
+    try:
+        with open(cache_path(path, digest), 'rb') as f:
+            if pickle.load(f) != _cache_header(digest):
+                return None
+            with _paused_gc():
+                reg = pickle.load(f)
+    except CACHE_ERRORS:
+        return None
+    reg.source = path
+    return reg
+
+
+def merge_sources(loaded):
+    """Merge ``(source, cells)`` pairs into one list of cells by id.
+
+    Sources are taken in order and the first to hold an id keeps it. A
+    later cell with the same id is dropped: silently when its record is
+    identical, and otherwise reported as a conflict. Returns ``(cells,
+    conflicts)``, each conflict being ``(cell_id, kept_source,
+    dropped_source)``.
+    """
+    merged, origin, conflicts = {}, {}, []
+    for source, cells in loaded:
+        for cell in cells:
+            kept = merged.get(cell.id)
+            if kept is None:
+                merged[cell.id] = cell
+                origin[cell.id] = source
+            elif kept.to_record() != cell.to_record():
+                conflicts.append((cell.id, origin[cell.id], source))
+    return list(merged.values()), conflicts
+
+
+def split_workers(sources, workers):
+    """Each source's share of ``workers`` parsing processes.
+
+    Only streamed sources parse in a process pool, so they split the
+    workers between them; loading them side by side then never runs more
+    processes than loading one. Every source gets at least one worker,
+    which means parsing in-process.
+    """
+    streamed = [i for i, source in enumerate(sources) if ingest.is_streamed(source)]
+    share, extra = divmod(workers, max(len(streamed), 1))
+    shares = [1] * len(sources)
+    for n, i in enumerate(streamed):
+        shares[i] = max(share + (n < extra), 1)
+    return shares
+
+
+def load_sources(sources):
+    """Load several registry sources concurrently and merge them by id.
+
+    Each source is loaded and snapshotted on its own, so one facility's
+    update leaves the other sources' snapshots valid. Streamed sources
+    share the load workers (see :func:`split_workers`). Returns ``(cells,
+    conflicts)`` as :func:`merge_sources` does, logging each conflict.
+    """
+    with concurrent.futures.ThreadPoolExecutor(max(len(sources), 1)) as pool:
+        loaded = list(pool.map(load_registry, sources, split_workers(sources, ingest.WORKERS)))
+    cells, conflicts = merge_sources(zip(sources, loaded))
+    for cell_id, kept, dropped in conflicts:
+        log.warning("Cell %r differs between %s and %s; keeping %s", cell_id, kept, dropped, kept)
+    return cells, conflicts
+
+
+def index_cells(cells):
+    """Return ``(by_id, by_name)`` lookups over the registry cells.
+
+    Ids are unique; if two cells share a name the first one wins, as the
+    dashboard's linear search used to.
+    """
+    by_id = {cell.id: cell for cell in cells}
+    by_name = {}
+    for cell in cells:
+        by_name.setdefault(cell.name, cell)
+    return by_id, by_name
+
+if hasattr(np, 'bitwise_count'):
+    _popcount = np.bitwise_count
+else:  # numpy < 2.0
+    _POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def _popcount(bits):
+        return _POPCOUNT_TABLE[bits]
+
+
+def unpack(bits, n_rows):
+    """Expand a packed row bitmap into a boolean mask of length ``n_rows``."""
+    return np.unpackbits(bits, count=n_rows).view(bool)
+
+
+class FacetIndex:
+    """Inverted index from the terms of a list-valued column to row bitmaps.
+
+    ``bits[i]`` is the bitmap of rows containing ``terms[i]``, packed eight
+    rows to a byte in ``np.packbits`` order, so each term costs N/8 bytes.
+    ``row_bits`` holds the same matrix row-major (one packed term vector per
+    row) so that the rows x terms matrix of any filtered subset is a row
+    slice and an unpack.
+    """
+
+    def __init__(self, values):
+        codes = {}
+        rows, term_codes = [], []
+        n_rows = 0
+        for row, terms in enumerate(values):
+            n_rows = row + 1
+            if not isinstance(terms, (list, tuple, np.ndarray)):
+                continue  # missing list
+            for term in terms:
+                rows.append(row)
+                term_codes.append(codes.setdefault(term, len(codes)))
+        self._build(list(codes), rows, term_codes, n_rows)
+
+    def _build(self, terms, rows, term_codes, n_rows):
+        """Set the bitmaps from ``(row, term code)`` pairs, where
+        ``terms[code]`` is the term; terms no row uses are dropped."""
+        rows = np.asarray(rows, dtype=np.intp)
+        term_codes = np.asarray(term_codes, dtype=np.intp)
+        used = np.bincount(term_codes, minlength=len(terms)) > 0
+        self.terms = sorted(term for term, keep in zip(terms, used) if keep)
+        self.positions = {term: i for i, term in enumerate(self.terms)}
+        self.n_rows = n_rows
+
+        # Sort the vocabulary, then set every (term, row) bit in one pass
+        remap = np.array([self.positions.get(t, -1) for t in terms], dtype=np.intp)
+        term_rows = remap[term_codes]
+        self.bits = np.zeros((len(self.terms), (n_rows + 7) // 8), dtype=np.uint8)
+        np.bitwise_or.at(
+            self.bits, (term_rows, rows >> 3), (0x80 >> (rows & 7)).astype(np.uint8)
+        )
+        self.row_bits = np.zeros((n_rows, (len(self.terms) + 7) // 8), dtype=np.uint8)
+        np.bitwise_or.at(
+            self.row_bits, (rows, term_rows >> 3), (0x80 >> (term_rows & 7)).astype(np.uint8)
+        )
+
+    def pairs(self, chunk_rows=1 << 16):
+        """``(rows, term positions)`` of every set bit, unpacked
+        ``chunk_rows`` rows at a time."""
+        rows, terms = [np.empty(0, dtype=np.intp)], [np.empty(0, dtype=np.intp)]
+        for start in range(0, self.n_rows, chunk_rows):
+            chunk = np.unpackbits(self.row_bits[start:start + chunk_rows], axis=1, count=len(self.terms))
+            chunk_rows_set, chunk_terms = np.nonzero(chunk)
+            rows.append(chunk_rows_set + start)
+            terms.append(chunk_terms)
+        return np.concatenate(rows), np.concatenate(terms)
+
+    def patched(self, values, reuse):
+        """A new index over ``values`` that copies what it can from this one.
+
+        ``reuse[i]`` is the row of this index that already holds the terms
+        of new row ``i``, or -1 if they must be read from ``values[i]``.
+        Only the latter rows are scanned in Python; the rest are moved over
+        as bit coordinates.
+        """
+        reuse = np.asarray(reuse, dtype=np.intp)
+        kept = reuse >= 0
+        moved = np.full(self.n_rows, -1, dtype=np.intp)
+        moved[reuse[kept]] = np.flatnonzero(kept)
+        rows, term_codes = self.pairs()
+        rows = moved[rows]
+        keep = rows >= 0
+        rows, term_codes = [rows[keep]], [term_codes[keep]]
+
+        codes = dict(self.positions)
+        fresh_rows, fresh_codes = [], []
+        for row in np.flatnonzero(~kept).tolist():
+            for term in values[row]:
+                fresh_rows.append(row)
+                fresh_codes.append(codes.setdefault(term, len(codes)))
+        index = FacetIndex.__new__(FacetIndex)
+        index._build(list(codes), np.concatenate(rows + [np.asarray(fresh_rows, dtype=np.intp)]),
+                     np.concatenate(term_codes + [np.asarray(fresh_codes, dtype=np.intp)]), len(reuse))
+        return index
+
+    def expanded(self, closure):
+        """A new index over the same rows with each term replaced by the
+        terms ``closure[term]`` (by default, the term itself).
+
+        Used to index a taxonomy: with each term's ancestors in its closure,
+        a parent's bitmap covers every row holding any of its descendants.
+        """
+        codes = {}
+        mapped = [[codes.setdefault(t, len(codes)) for t in closure.get(term, (term,))] for term in self.terms]
+        sizes = np.array([len(terms) for terms in mapped], dtype=np.intp)
+        flat = np.array([code for terms in mapped for code in terms], dtype=np.intp)
+        starts = np.cumsum(sizes) - sizes
+
+        # Every (row, term) bit becomes one bit per term in its closure
+        rows, positions = self.pairs()
+        repeats = sizes[positions]
+        offsets = np.arange(repeats.sum()) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+        index = FacetIndex.__new__(FacetIndex)
+        index._build(list(codes), np.repeat(rows, repeats),
+                     flat[np.repeat(starts[positions], repeats) + offsets], self.n_rows)
+        return index
+
+    def packed(self, selected):
+        """Packed bitmap of rows containing any of the ``selected`` terms."""
+        picked = [self.positions[t] for t in selected if t in self.positions]
+        if not picked:
+            return np.zeros(self.bits.shape[1], dtype=np.uint8)
+        return np.bitwise_or.reduce(self.bits[picked], axis=0)
+
+    def mask(self, selected):
+        """Boolean row mask of rows containing any of the ``selected`` terms."""
+        return unpack(self.packed(selected), self.n_rows)
+
+    def counts(self, mask):
+        """Rows under ``mask`` containing each term, aligned with ``terms``.
+
+        One pass over the packed bitmaps: AND every term's bitmap with the
+        packed mask and popcount the result.
+        """
+        return _popcount(self.bits & np.packbits(mask)).sum(axis=1)
+
+    def matrix(self, mask=None):
+        """Boolean rows x terms matrix, restricted to ``mask`` when given."""
+        rows = self.row_bits if mask is None else self.row_bits[mask]
+        return np.unpackbits(rows, axis=1, count=len(self.terms)).view(bool)
+
+    def sizes(self):
+        """How many terms each row holds."""
+        return _popcount(self.row_bits).sum(axis=1)
+
+    def overlaps(self, selections):
+        """How many of each selection's terms every row holds.
+
+        Returns a selections x rows float32 array from one matrix product
+        of the selections with the unpacked bitmaps of the terms they use.
+        """
+        used = sorted({self.positions[t] for selected in selections for t in selected if t in self.positions})
+        column = {position: j for j, position in enumerate(used)}
+        weights = np.zeros((len(selections), len(used)), dtype=np.float32)
+        for i, selected in enumerate(selections):
+            for t in set(selected):
+                if t in self.positions:
+                    weights[i, column[self.positions[t]]] = 1
+        return weights @ np.unpackbits(self.bits[used], axis=1, count=self.n_rows).astype(np.float32)
+
+
+class SortedIndex:
+    """Sorted view of a numeric column, answering range queries by binary search.
+
+    ``order`` lists row positions by ascending value and ``values`` holds the
+    matching sorted values; rows with a missing (NaN) value are left out,
+    so they never match a range.
+    """
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype=float)
+        self.n_rows = len(values)
+        order = np.argsort(values, kind='stable')
+        self.order = order[~np.isnan(values[order])]
+        self.values = values[self.order]
+
+    @property
+    def bounds(self):
+        """``(min, max)`` of the known values, or ``None`` if there are none."""
+        if not len(self.values):
+            return None
+        return self.values[0], self.values[-1]
+
+    def rows(self, low=None, high=None):
+        """Row positions with ``low <= value <= high``; either bound may be open."""
+        start = 0 if low is None else np.searchsorted(self.values, low, side='left')
+        stop = len(self.values) if high is None else np.searchsorted(self.values, high, side='right')
+        return self.order[start:stop]
+
+    def mask(self, low=None, high=None):
+        """Boolean row mask for ``low <= value <= high``."""
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self.rows(low, high)] = True
+        return mask
+
+    def by_row(self):
+        """The values in row order, NaN where missing."""
+        values = np.full(self.n_rows, np.nan)
+        values[self.order] = self.values
+        return values
+
+
+class IntervalIndex:
+    """Numeric ``(low, high)`` intervals per row, answering overlap queries.
+
+    Backed by a :class:`SortedIndex` over each end, so a query is two
+    binary searches. Rows with a missing (NaN) interval never match.
+    """
+
+    def __init__(self, spans):
+        spans = np.asarray(spans, dtype=float).reshape(-1, 2)
+        self.lows = SortedIndex(spans[:, 0])
+        self.highs = SortedIndex(spans[:, 1])
+
+    @property
+    def bounds(self):
+        """``(min low, max high)`` of the known intervals, or ``None``."""
+        if self.lows.bounds is None:
+            return None
+        return self.lows.bounds[0], self.highs.bounds[1]
+
+    def mask(self, low=None, high=None):
+        """Boolean row mask for intervals overlapping ``[low, high]``."""
+        return self.lows.mask(None, high) & self.highs.mask(low, None)
+
+
+def _frozen(values, dtype=None):
+    array = np.asarray(values, dtype=dtype)
+    array.flags.writeable = False
+    return array
+
+
+def _numeric(values):
+    """Whether ``values`` has a number and nothing but numbers and ``None``."""
+    numbers = [v for v in values if v is not None]
+    return bool(numbers) and all(
+        isinstance(v, (int, float)) and not isinstance(v, bool) for v in numbers)
+
+
+class Registry:
+    """The loaded registry and everything derived from it.
+
+    One instance is shared by every session in the process, so it is
+    read-only: index arrays are frozen, and ``cells`` must not be mutated.
+    Callers filter with boolean masks over the rows and materialise only
+    the rows they display, through :meth:`frame`.
+    """
+
+    def __init__(self, cells, source=None, conflicts=(), base=None, reuse=None):
+        self.cells = tuple(cells)
+        self.source = source  # registry path (or list of them), when loaded from one
+        self.conflicts = conflicts  # see merge_sources
+        self.generation = 0 if base is None else base.generation + 1
+        self.digest = None  # content hash of the sources, set by load and on reload
+        self.by_id, self.by_name = index_cells(self.cells)
+        self.row_by_id = {cell.id: row for row, cell in enumerate(self.cells)}
+        self.columns = flat_columns(self.cells)
+        self._column_cache = {}
+
+        # Inverted indexes for the list-valued filters and for requirement
+        # matching, patched from the previous registry's on a reload (see
+        # updated)
+        for name, values in (
+            ('techniques', [c.techniques for c in self.cells]),
+            ('instruments', [c.instruments for c in self.cells]),
+            ('window_materials', [c.window_materials for c in self.cells]),
+            ('limitation_phrases', [
+                tuple(p for _, phrases in c.limitations_3r or () for p in phrases) for c in self.cells
+            ]),
+        ):
+            index = FacetIndex(values) if base is None else getattr(base, name).patched(values, reuse)
+            setattr(self, name, index)
+        self._resolve_glossary()
+
+        # Columns the filters and metrics read on every rerun
+        self.ids = _frozen([c.id for c in self.cells], dtype=object)
+        self.names = _frozen([c.name for c in self.cells], dtype=object)
+        self.cad_available = _frozen([c.cad_available == True for c in self.cells], dtype=bool)  # noqa: E712
+        self.pressure_control = _frozen([c.limit('pressure_control') == True for c in self.cells], dtype=bool)  # noqa: E712
+        # Sorted indexes over every numeric operating limit, for range
+        # filters; cells without a stated max temperature count as ambient.
+        # Defaults apply first, so a defaulted limit is always indexed, even
+        # when no cell (or no registry entry at all) states it.
+        limit_names = [c[len(LIMITS_PREFIX):] for c in self.columns if c.startswith(LIMITS_PREFIX)]
+        limit_names += [name for name in LIMIT_DEFAULTS if name not in limit_names]
+        self.limits = {}
+        for name in limit_names:
+            default = LIMIT_DEFAULTS.get(name)
+            values = [c.limit(name, default) for c in self.cells]
+            if not _numeric(values + [default]):
+                continue
+            self.limits[name] = SortedIndex([np.nan if v is None else v for v in values])
+        self.high_temp = self.limits['max_temp_c'].mask(HIGH_TEMP_C)
+        # Every cell's operating envelope, in an R-tree for containment and
+        # overlap queries on planned conditions
+        self.envelope = envelopes.EnvelopeIndex.build(self.cells, limit_names, LIMIT_DEFAULTS)
+        # Millimetre dimensions parsed from the free-text sample size, once
+        # per distinct text (kept for display), as interval indexes for
+        # range filters
+        self.parsed_sample_sizes = parsed = {
+            size: sample_sizes.parse(size) for size in {c.sample_size for c in self.cells}
+        }
+        self.sample_confidence = _frozen([parsed[c.sample_size][1] for c in self.cells], dtype=object)
+        self.sample_dims = {
+            name: IntervalIndex([parsed[c.sample_size][0].get(name, (np.nan, np.nan)) for c in self.cells])
+            for name in sample_sizes.DIMENSIONS
+        }
+        self._freeze()
+
+    def _resolve_glossary(self):
+        # Technique name -> glossary term, for the technique vocabulary;
+        # redone on unpickling so a cached registry sees glossary edits
+        self.glossary_terms = glossary.resolve(self.techniques.terms)
+        # Canonical techniques with their ancestors, indexed so that a
+        # parent's bitmap already covers its descendants
+        closure = glossary.families(self.techniques.terms)
+        if closure != getattr(self, 'technique_closure', None):
+            self.technique_closure = closure
+            self.technique_families = self.techniques.expanded(closure)
+
+    def _freeze(self):
+        arrays = [self.ids, self.names, self.cad_available, self.pressure_control, self.high_temp,
+                  self.sample_confidence]
+        for index in (self.techniques, self.instruments, self.technique_families,
+                      self.window_materials, self.limitation_phrases):
+            arrays += [index.bits, index.row_bits]
+        for index in self.limits.values():
+            arrays += [index.order, index.values]
+        for index in self.sample_dims.values():
+            for end in (index.lows, index.highs):
+                arrays += [end.order, end.values]
+        arrays += self.envelope.arrays()
+        for array in arrays:
+            array.flags.writeable = False
+
+    def __getstate__(self):
+        # The lazily built flat columns are cheap to rebuild; leave them out
+        return {**self.__dict__, '_column_cache': {}}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.generation = 0
+        self._resolve_glossary()
+        self._freeze()  # unpickled arrays come back writeable
+
+    @classmethod
+    def load(cls, path=REGISTRY_PATH):
+        """The registry at ``path``, a source or a list of them.
+
+        Served from the registry cache when it matches the sources' content
+        hash, so a restarted process skips parsing and indexing; otherwise
+        built (from the snapshots where they match) and cached.
+        """
+        digest = content_hash(path)
+        reg = read_cache(path, digest)
+        if reg is not None:
+            reg.digest = digest
+            return reg
+        if isinstance(path, (list, tuple)):
+            cells, conflicts = load_sources(path)
+            reg = cls(cells, source=path, conflicts=conflicts)
+        else:
+            reg = cls(load_registry(path), source=path)
+        reg.digest = digest
+        try:
+            write_cache(reg, path, digest)
+        except CACHE_ERRORS:
+            pass  # read-only deployments still work, just without the cache
+        return reg
+
+    def __len__(self):
+        return len(self.cells)
+
+    def updated(self, cells, conflicts=()):
+        """The registry over a reloaded list of ``cells``, built from this one.
+
+        Cells are matched to this registry's by id. An unchanged cell keeps
+        its existing object and facet index row; only inserted and updated
+        cells are indexed from scratch. Returns ``(registry, changes)``,
+        where ``changes`` maps ``'inserted'``, ``'updated'`` and
+        ``'deleted'`` to lists of ids. If nothing changed, the registry
+        shares every index with this one, but is still a new object: this
+        one may already be shared, so the caller can set its ``digest``.
+        """
+        cells = list(cells)
+        reuse = np.full(len(cells), -1, dtype=np.intp)
+        changes = {'inserted': [], 'updated': [], 'deleted': []}
+        seen = set()
+        for row, cell in enumerate(cells):
+            old_row = self.row_by_id.get(cell.id)
+            if old_row is None:
+                changes['inserted'].append(cell.id)
+            elif cell.id in seen or not self.cells[old_row].same(cell):
+                changes['updated'].append(cell.id)
+            else:
+                cells[row] = self.cells[old_row]
+                reuse[row] = old_row
+            seen.add(cell.id)
+        changes['deleted'] = [cell.id for cell in self.cells if cell.id not in seen]
+        if (not any(changes.values()) and len(cells) == len(self)
+                and (reuse == np.arange(len(self))).all()):
+            reg = Registry.__new__(Registry)
+            reg.__dict__.update(self.__dict__)
+            reg.conflicts, reg.generation, reg.digest = conflicts, self.generation + 1, None
+            return reg, changes
+        return Registry(cells, self.source, conflicts, base=self, reuse=reuse), changes
+
+    def column(self, name):
+        """The flattened column ``name`` for every row, as a frozen array.
+
+        Built on first use and cached; list-valued columns hold tuples.
+        """
+        if name not in self._column_cache:
+            values = pd.Series([c.flat(name) for c in self.cells], dtype=object if not self.cells else None)
+            self._column_cache[name] = _frozen(values.to_numpy())
+        return self._column_cache[name]
+
+    def frame(self, rows=None, columns=None):
+        """Flattened DataFrame of ``rows`` (a mask or positions; all if None).
+
+        ``columns`` defaults to every column, in schema order.
+        """
+        rows = slice(None) if rows is None else rows
+        return pd.DataFrame({name: self.column(name)[rows] for name in columns or self.columns})
+
+    def all_rows(self):
+        """A fresh mask selecting every row, for callers to narrow down."""
+        return np.ones(len(self), dtype=bool)
+
+    def mask_of(self, ids):
+        """Boolean row mask selecting the cells with the given ids."""
+        mask = np.zeros(len(self), dtype=bool)
+        mask[[self.row_by_id[i] for i in ids if i in self.row_by_id]] = True
+        return mask
+
+    def filter(self, techniques=(), instruments=(), cad_only=False,
+               pressure_only=False, high_temp_only=False, limit_ranges=None,
+               technique_families=(), sample_ranges=None, envelope_contains=None,
+               envelope_overlaps=None):
+        """Boolean row mask for the dashboard's sidebar filters.
+
+        Facets OR their selected terms through the bitmap indexes and are
+        ANDed with each other, with the capability flags and with
+        ``limit_ranges``, a mapping of operating limit (e.g. ``'max_temp_c'``)
+        to an inclusive ``(low, high)`` range resolved through
+        :attr:`limits`. ``technique_families`` selects canonical techniques
+        together with everything under them in the taxonomy.
+        ``sample_ranges`` maps sample dimensions (e.g. ``'diameter_mm'``) to
+        inclusive ranges, and keeps the cells whose parsed size overlaps
+        them (see :attr:`sample_dims`). ``envelope_contains`` and
+        ``envelope_overlaps`` map envelope axes (e.g. ``'temp_c'``) to
+        planned ``(low, high)`` ranges, and keep the cells whose operating
+        envelope contains or overlaps them (see :attr:`envelope`).
+        """
+        mask = self.all_rows()
+        if techniques:
+            mask &= self.techniques.mask(techniques)
+        if technique_families:
+            mask &= self.technique_families.mask(technique_families)
+        if instruments:
+            mask &= self.instruments.mask(instruments)
+        if cad_only:
+            mask &= self.cad_available
+        if pressure_only:
+            mask &= self.pressure_control
+        if high_temp_only:
+            mask &= self.high_temp
+        for name, (low, high) in (limit_ranges or {}).items():
+            mask &= self.limits[name].mask(low, high)
+        for name, (low, high) in (sample_ranges or {}).items():
+            mask &= self.sample_dims[name].mask(low, high)
+        if envelope_contains:
+            mask &= self.envelope.containing(envelope_contains)
+        if envelope_overlaps:
+            mask &= self.envelope.overlapping(envelope_overlaps)
+        return mask
+
+    def facet_counts(self, facet, **filters):
+        """Per-term counts for ``facet`` (``'techniques'``, ``'instruments'``
+        or ``'technique_families'``).
+
+        Each count is the number of rows the term would match under every
+        other active filter, so the facet's own selection is ignored.
+        """
+        return dict(zip(
+            getattr(self, facet).terms,
+            getattr(self, facet).counts(self.filter(**{**filters, facet: ()})).tolist(),
+        ))
+
+    def metrics(self, mask):
+        """Counts shown in the dashboard's metrics row for ``mask``."""
+        return {
+            'cells': int(np.count_nonzero(mask)),
+            'cad_ready': int(np.count_nonzero(self.cad_available & mask)),
+            'high_temp': int(np.count_nonzero(self.high_temp & mask)),
+        }
+
+
+if __name__ == '__main__':
+    # Builds the snapshots (with pyarrow) and the registry cache for the given
+    # sources. Through the imported module, so the cache pickles
+    # registry.Registry rather than __main__.Registry, which the app and the
+    # API could not unpickle.
+    import registry
+    source = registry.registry_sources(os.pathsep.join(sys.argv[1:])) if len(sys.argv) > 1 else REGISTRY_PATH
+    registry.Registry.load(source)
+    print(registry.cache_path(source, registry.content_hash(source)))
@@ -0,0 +1,117 @@
+"""Process-wide cache of filter results, shared by every session.
+
+Sessions with the same sidebar state need the same row mask, metrics,
+facet counts, table and compatibility matrix. :class:`ResultCache` keeps
+them under the normalized filter state (:func:`normalize_filters`). When
+its memory budget is exceeded it evicts the least recently used results,
+and it empties itself when the registry's content hash changes.
+
+``OPERANDO_RESULT_CACHE_MB`` sets the budget (default 64; 0 disables the
+cache).
+"""
+import collections
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+BUDGET_BYTES = int(float(os.environ.get('OPERANDO_RESULT_CACHE_MB', 64)) * 1024 * 1024)
+
+
+def normalize_filters(techniques=(), instruments=(), cad_only=False, pressure_only=False,
+                      high_temp_only=False, limit_ranges=None, technique_families=(), sample_ranges=None,
+                      envelope_contains=None, envelope_overlaps=None):
+    """:meth:`registry.Registry.filter` arguments in canonical form.
+
+    Selections are de-duplicated and sorted, flags are plain bools and
+    ranges are ordered by name, so sidebar states that select the
+    same rows normalize to equal dicts.
+    """
+    return {
+        'techniques': tuple(sorted(set(techniques))),
+        'instruments': tuple(sorted(set(instruments))),
+        'cad_only': bool(cad_only),
+        'pressure_only': bool(pressure_only),
+        'high_temp_only': bool(high_temp_only),
+        'limit_ranges': dict(sorted((limit_ranges or {}).items())),
+        'technique_families': tuple(sorted(set(technique_families))),
+        'sample_ranges': dict(sorted((sample_ranges or {}).items())),
+        'envelope_contains': dict(sorted((envelope_contains or {}).items())),
+        'envelope_overlaps': dict(sorted((envelope_overlaps or {}).items())),
+    }
+
+
+def filter_key(filters):
+    """Hashable key for a dict from :func:`normalize_filters`."""
+    return tuple(
+        (name, tuple(value.items()) if isinstance(value, dict) else value)
+        for name, value in filters.items()
+    )
+
+
+def sizeof(value):
+    """Approximate bytes held by a cached result."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """LRU cache of per-filter-state results within a memory budget."""
+
+    def __init__(self, budget_bytes=BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self.nbytes = 0
+        self.hits = self.misses = 0
+        self._entries = collections.OrderedDict()  # key -> (value, nbytes)
+        self._registry = None  # content hash of the registry the entries belong to
+        self._lock = threading.Lock()
+
+    def get(self, reg, kind, filters, compute):
+        """The ``kind`` result (e.g. ``'mask'``) for ``filters`` on ``reg``.
+
+        ``filters`` comes from :func:`normalize_filters`. On a miss,
+        ``compute()`` is called and its result cached. Every session
+        shares cached results, so cached arrays are frozen. Registries
+        without a content hash (built in memory) are told apart by
+        identity.
+        """
+        key = (kind, filter_key(filters))
+        registry_key = reg.digest or id(reg)
+        with self._lock:
+            if registry_key != self._registry:
+                self._entries.clear()
+                self.nbytes = 0
+                self._registry = registry_key
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # Computed outside the lock so sessions never wait on each other
+        value = compute()
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+        size = sizeof(value)
+        with self._lock:
+            if registry_key == self._registry and key not in self._entries and size <= self.budget_bytes:
+                self._entries[key] = (value, size)
+                self.nbytes += size
+                while self.nbytes > self.budget_bytes:
+                    _, (_, freed) = self._entries.popitem(last=False)
+                    self.nbytes -= freed
+        return value
+
+    def stats(self):
+        """Entry count, bytes held and hit/miss counters."""
+        with self._lock:
+            return {'entries': len(self._entries), 'nbytes': self.nbytes,
+                    'budget_bytes': self.budget_bytes, 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,134 @@
+"""Parsing of the free-text ``specifications.sample_size`` into dimensions.
+
+Registry entries state sample sizes loosely ("2x4cm aperture", "18mm
+diameter", "2.9mm ID", "3-12mm electrode", "2032 Standard", "Variable").
+:func:`parse` reads one into millimetre dimensions, each an inclusive
+``(low, high)`` interval (``low == high`` for a single size), together with
+how far the text can be trusted:
+
+* ``'stated'``: sizes, units and the dimension they measure are all given,
+  e.g. "18mm diameter" or "2x4cm aperture" (width x height).
+* ``'inferred'``: the dimension is assumed, e.g. "3-12mm electrode" is
+  taken as a diameter, and "2032 Standard" as a CR2032 coin cell of 20 mm
+  diameter.
+* ``'none'``: no size of these dimensions could be read ("Variable",
+  "Flexible", "500um thick").
+
+A text may give several sizes ("10mm long capillary, 1mm ID"). Each
+keyword qualifies the size it directly follows, or else the size it
+directly precedes, never crossing a comma or another separator, so that
+example reads as an inner diameter of 1 mm and nothing else. A size no
+keyword qualifies is taken as an (inferred) diameter only if it is the one
+such size and no other size gives a dimension indexed here, as in
+"electrode 12mm, 50um thick". A dimension given twice spans both sizes and
+counts as inferred.
+
+The registry parses each distinct sample size once at load and indexes
+every dimension for range queries (see :class:`registry.IntervalIndex`).
+"""
+import re
+
+DIMENSIONS = ('diameter_mm', 'width_mm', 'height_mm', 'inner_diameter_mm')
+CONFIDENCE = ('stated', 'inferred', 'none')
+
+UNITS = {'mm': 1.0, 'cm': 10.0, 'um': 0.001, 'µm': 0.001, 'μm': 0.001}
+
+_NUMBER = r'\d+(?:\.\d+)?'
+_UNIT = r'mm|cm|[uµμ]m'
+# A size, a range of sizes or a width x height, ending in a unit; the first
+# number may carry its own ("2cm x 4cm")
+_SIZE = re.compile(
+    rf'(?P<a>{_NUMBER})\s*(?P<unit_a>{_UNIT})?\s*'
+    rf'(?:(?P<op>[x×*]|-|–|to)\s*(?P<b>{_NUMBER})\s*)?'
+    rf'(?P<unit>{_UNIT})\b',
+    re.IGNORECASE,
+)
+# The dimension a size measures; "other" is one not indexed here. Inner
+# diameter comes first so "inner diameter" is not read as a diameter.
+_KEYWORD = re.compile(
+    r'(?P<inner_diameter_mm>\b(?:I\.?D\.?|inner\s+diam(?:eter)?|bore)(?!\w))'
+    r'|(?P<diameter_mm>\b(?:O\.?D\.?|diam(?:eter)?|dia)(?!\w)|[Øø⌀])'
+    r'|(?P<other>\b(?:thick(?:ness)?|length|long|depth|deep|tall)\b)',
+    re.IGNORECASE,
+)
+# Keywords never qualify a size across these
+_SEPARATOR = re.compile(r'[,;/()]|\band\b|\bwith\b', re.IGNORECASE)
+# Coin cell codes: diameter in mm, then thickness in tenths of a mm
+_COIN = re.compile(r'\b(?:[CLS]R)?(?P<diameter>\d{2})(?P<thickness>\d{2})\b', re.IGNORECASE)
+_COIN_CONTEXT = re.compile(r'\bcoin|\bstandard\b|\b[CLS]R\d{4}\b', re.IGNORECASE)
+
+
+def _mm(value, unit):
+    return float(value) * UNITS[unit.lower()]
+
+
+def _keyword(text, start, stop):
+    """The first keyword in ``text[start:stop]`` as ``(name, end)``, or ``None``."""
+    match = _KEYWORD.search(text, start, stop)
+    return None if match is None else (match.lastgroup, match.end())
+
+
+def parse(text):
+    """``(dimensions, confidence)`` for one sample size.
+
+    ``dimensions`` maps names from :data:`DIMENSIONS` to ``(low, high)``
+    millimetres and leaves out those the text does not give; ``confidence``
+    is one of :data:`CONFIDENCE`.
+    """
+    if not isinstance(text, str):
+        return {}, 'none'
+    sizes = list(_SIZE.finditer(text))
+    if not sizes:
+        coin = _COIN.search(text)
+        if coin is not None and _COIN_CONTEXT.search(text):
+            diameter = float(coin['diameter'])
+            return {'diameter_mm': (diameter, diameter)}, 'inferred'
+        return {}, 'none'
+
+    # (dimension, span, stated) per size; a keyword one size claims from
+    # the text after it is not available to the next size
+    found, unqualified = [], []
+    claimed = 0
+    for i, size in enumerate(sizes):
+        a = _mm(size['a'], size['unit_a'] or size['unit'])
+        b = None if size['b'] is None else _mm(size['b'], size['unit'])
+        if size['op'] and size['op'].lower() in ('x', '×', '*'):
+            found += [('width_mm', (a, a), True), ('height_mm', (b, b), True)]
+            continue
+        span = (a, a) if b is None else (min(a, b), max(a, b))
+
+        next_start = sizes[i + 1].start() if i + 1 < len(sizes) else len(text)
+        separator = _SEPARATOR.search(text, size.end(), next_start)
+        keyword = _keyword(text, size.end(), separator.start() if separator else next_start)
+        if keyword is None:
+            before = max([claimed] + [m.end() for m in _SEPARATOR.finditer(text, claimed, size.start())])
+            keyword = _keyword(text, before, size.start())
+        else:
+            claimed = keyword[1]
+        if keyword is None:
+            unqualified.append(span)
+        elif keyword[0] != 'other':
+            found.append((keyword[0], span, True))
+    if not found and len(unqualified) == 1:
+        found.append(('diameter_mm', unqualified[0], False))
+
+    dimensions, confidence = {}, 'stated'
+    for name, (low, high), stated in found:
+        if name in dimensions:
+            low, high = min(low, dimensions[name][0]), max(high, dimensions[name][1])
+            stated = False
+        dimensions[name] = (low, high)
+        if not stated:
+            confidence = 'inferred'
+    return dimensions, confidence if dimensions else 'none'
+
+
+def describe(dimensions):
+    """Short text for parsed ``dimensions``, e.g. ``'diameter 3–12 mm'``."""
+    parts = []
+    for name in DIMENSIONS:
+        if name in dimensions:
+            low, high = dimensions[name]
+            size = f"{low:g}" if low == high else f"{low:g}–{high:g}"
+            parts.append(f"{name[:-len('_mm')].replace('_', ' ')} {size} mm")
+    return ', '.join(parts)
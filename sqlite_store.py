@@ -0,0 +1,268 @@
+"""SQLite storage backend for the operando cell registry.
+
+Ingests the registry JSON schema into an indexed SQLite database so the
+dashboard's filters can be pushed down to SQL. The tables are: ``cells``;
+one table each for techniques, instruments, window materials and 3R
+limitations; numeric operating limits (``cell_limits``); and
+``cell_history``, an append-only log of every version of every cell::
+
+    python sqlite_store.py [registry.json[:other.json...]] [registry.sqlite]
+
+:class:`SQLiteRegistry` takes the same filter keyword arguments as
+:meth:`registry.Registry.filter` and :meth:`registry.Registry.facet_counts`.
+It returns matching ids or counts, never whole tables;
+:meth:`registry.Registry.mask_of` turns the ids into a row mask.
+"""
+import contextlib
+import datetime
+import json
+import os
+import sqlite3
+import sys
+
+import registry
+
+DB_PATH = os.environ.get('OPERANDO_SQLITE_PATH', 'operando_cell_registry.sqlite')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    hash TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    ingested_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cells (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    type TEXT,
+    primary_email TEXT,
+    sample_size TEXT,
+    pressure_control INTEGER NOT NULL,
+    cad_available INTEGER NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cells_position ON cells(position);
+CREATE INDEX IF NOT EXISTS cells_name ON cells(name);
+CREATE INDEX IF NOT EXISTS cells_pressure ON cells(pressure_control, id);
+CREATE INDEX IF NOT EXISTS cells_cad ON cells(cad_available, id);
+
+CREATE TABLE IF NOT EXISTS cell_techniques (
+    technique TEXT NOT NULL,
+    cell_id TEXT NOT NULL REFERENCES cells(id) ON DELETE CASCADE,
+    PRIMARY KEY (technique, cell_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cell_techniques_cell ON cell_techniques(cell_id);
+
+CREATE TABLE IF NOT EXISTS cell_instruments (
+    instrument TEXT NOT NULL,
+    cell_id TEXT NOT NULL REFERENCES cells(id) ON DELETE CASCADE,
+    PRIMARY KEY (instrument, cell_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cell_instruments_cell ON cell_instruments(cell_id);
+
+CREATE TABLE IF NOT EXISTS cell_window_materials (
+    material TEXT NOT NULL,
+    cell_id TEXT NOT NULL REFERENCES cells(id) ON DELETE CASCADE,
+    PRIMARY KEY (material, cell_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS cell_limitations (
+    cell_id TEXT NOT NULL REFERENCES cells(id) ON DELETE CASCADE,
+    category TEXT NOT NULL,
+    ordinal INTEGER NOT NULL,
+    limitation TEXT NOT NULL,
+    PRIMARY KEY (cell_id, category, ordinal)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cell_limitations_text ON cell_limitations(category, limitation);
+
+CREATE TABLE IF NOT EXISTS cell_limits (
+    name TEXT NOT NULL,
+    value REAL NOT NULL,
+    cell_id TEXT NOT NULL REFERENCES cells(id) ON DELETE CASCADE,
+    PRIMARY KEY (name, value, cell_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS cell_history (
+    cell_id TEXT NOT NULL,
+    source_hash TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    record TEXT
+);
+CREATE INDEX IF NOT EXISTS cell_history_cell ON cell_history(cell_id, recorded_at);
+"""
+
+FACET_TABLES = {
+    'techniques': ('cell_techniques', 'technique'),
+    'instruments': ('cell_instruments', 'instrument'),
+}
+
+
+def _placeholders(values):
+    return ', '.join('?' * len(values))
+
+
+class SQLiteRegistry:
+    """A registry stored in SQLite, queried with the dashboard's filters."""
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # One short-lived connection per call keeps the store safe to share
+        # across Streamlit's script threads
+        conn = sqlite3.connect(self.path)
+        conn.execute('PRAGMA foreign_keys = ON')
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # --- Ingest ---
+
+    def has_source(self, digest):
+        with self._connect() as conn:
+            return conn.execute('SELECT 1 FROM sources WHERE hash = ?', (digest,)).fetchone() is not None
+
+    def current_source(self):
+        """Content hash of the registry version the store holds, or ``None`` if empty."""
+        # Each ingest (re)writes its sources row, so the newest row is current
+        with self._connect() as conn:
+            row = conn.execute('SELECT hash FROM sources ORDER BY rowid DESC LIMIT 1').fetchone()
+        return row and row[0]
+
+    def sync(self, path=registry.REGISTRY_PATH):
+        """Ingest the registry at ``path`` (or merged sources) unless the
+        store already holds this version.
+
+        A version ingested before and since replaced (e.g. a reverted
+        edit) is ingested again, and its cells logged to the history anew.
+        """
+        digest = registry.content_hash(path)
+        if self.current_source() != digest:
+            label = os.pathsep.join(path) if isinstance(path, (list, tuple)) else path
+            self.ingest([cell.to_record() for cell in registry.load_registry(path)], digest, label)
+        return self
+
+    def ingest(self, records, digest, path=registry.REGISTRY_PATH):
+        """Make ``records`` the current registry, logging changes to history.
+
+        New and changed cells get a history row holding the new record;
+        cells that disappeared get one with a NULL record.
+        """
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        encoded = {r['id']: json.dumps(r, sort_keys=True) for r in records}
+        with self._connect() as conn:
+            current = dict(conn.execute('SELECT id, record FROM cells'))
+            history = [(cell_id, digest, now, text) for cell_id, text in encoded.items()
+                       if current.get(cell_id) != text]
+            history += [(cell_id, digest, now, None) for cell_id in current.keys() - encoded.keys()]
+
+            conn.execute('DELETE FROM cells')  # cascades to the child tables
+            for position, record in enumerate(records):
+                self._insert(conn, position, record, encoded[record['id']])
+            conn.executemany('INSERT INTO cell_history VALUES (?, ?, ?, ?)', history)
+            conn.execute('INSERT OR REPLACE INTO sources VALUES (?, ?, ?)', (digest, path, now))
+        with self._connect() as conn:
+            conn.execute('ANALYZE')
+
+    @staticmethod
+    def _insert(conn, position, record, encoded):
+        cell_id = record['id']
+        compatibility = record.get('compatibility', {})
+        specs = record.get('specifications', {})
+        limits = specs.get('operating_limits', {})
+        conn.execute(
+            'INSERT INTO cells VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (cell_id, position, record['name'], record.get('type'),
+             record.get('contact_info', {}).get('primary_email'), specs.get('sample_size'),
+             bool(limits.get('pressure_control')),
+             bool(record.get('digital_twin', {}).get('cad_available')), encoded),
+        )
+        conn.executemany('INSERT OR IGNORE INTO cell_techniques VALUES (?, ?)',
+                         [(t, cell_id) for t in compatibility.get('techniques', [])])
+        conn.executemany('INSERT OR IGNORE INTO cell_instruments VALUES (?, ?)',
+                         [(i, cell_id) for i in compatibility.get('instruments', [])])
+        conn.executemany('INSERT OR IGNORE INTO cell_window_materials VALUES (?, ?)',
+                         [(m, cell_id) for m in specs.get('window_materials', [])])
+        conn.executemany('INSERT INTO cell_limitations VALUES (?, ?, ?, ?)', [
+            (cell_id, category, ordinal, text)
+            for category, items in record.get('limitations_3r', {}).items()
+            for ordinal, text in enumerate(items)
+        ])
+        # Numeric operating limits, with the same defaults as the in-memory indexes
+        values = dict(limits)
+        for name, default in registry.LIMIT_DEFAULTS.items():
+            if values.get(name) is None:
+                values[name] = default
+        conn.executemany('INSERT INTO cell_limits VALUES (?, ?, ?)', [
+            (name, float(value), cell_id) for name, value in values.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        ])
+
+    # --- Queries ---
+
+    @staticmethod
+    def _where(techniques=(), instruments=(), cad_only=False, pressure_only=False,
+               high_temp_only=False, limit_ranges=None):
+        """SQL predicates over ``cells c`` and their parameters."""
+        clauses, params = [], []
+        for facet, selected in (('techniques', techniques), ('instruments', instruments)):
+            if selected:
+                table, column = FACET_TABLES[facet]
+                clauses.append(f"c.id IN (SELECT cell_id FROM {table} WHERE {column} IN ({_placeholders(selected)}))")
+                params += list(selected)
+        if cad_only:
+            clauses.append('c.cad_available = 1')
+        if pressure_only:
+            clauses.append('c.pressure_control = 1')
+        if high_temp_only:
+            clauses.append("c.id IN (SELECT cell_id FROM cell_limits WHERE name = 'max_temp_c' AND value >= ?)")
+            params.append(registry.HIGH_TEMP_C)
+        for name, (low, high) in (limit_ranges or {}).items():
+            bounds, values = ['name = ?'], [name]
+            if low is not None:
+                bounds.append('value >= ?')
+                values.append(low)
+            if high is not None:
+                bounds.append('value <= ?')
+                values.append(high)
+            clauses.append(f"c.id IN (SELECT cell_id FROM cell_limits WHERE {' AND '.join(bounds)})")
+            params += values
+        return ' AND '.join(clauses) or '1', params
+
+    def filter_ids(self, **filters):
+        """Ids of the matching cells, in registry order."""
+        where, params = self._where(**filters)
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT c.id FROM cells c WHERE {where} ORDER BY c.position", params)
+            return [cell_id for (cell_id,) in rows]
+
+    def facet_counts(self, facet, **filters):
+        """Like :meth:`registry.Registry.facet_counts`, as one GROUP BY query."""
+        table, column = FACET_TABLES[facet]
+        where, params = self._where(**{**filters, facet: ()})
+        with self._connect() as conn:
+            counts = dict(conn.execute(
+                f"SELECT f.{column}, COUNT(*) FROM {table} f JOIN cells c ON c.id = f.cell_id "
+                f"WHERE {where} GROUP BY f.{column}", params))
+            terms = [t for (t,) in conn.execute(f"SELECT DISTINCT {column} FROM {table} ORDER BY {column}")]
+        return {term: counts.get(term, 0) for term in terms}
+
+    def history(self, cell_id):
+        """Every recorded version of a cell as ``(recorded_at, record or None)``."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT recorded_at, record FROM cell_history WHERE cell_id = ? ORDER BY recorded_at, rowid',
+                (cell_id,))
+            return [(at, json.loads(text) if text else None) for at, text in rows]
+
+
+if __name__ == '__main__':
+    source = registry.registry_sources(sys.argv[1]) if len(sys.argv) > 1 else registry.REGISTRY_PATH
+    target = sys.argv[2] if len(sys.argv) > 2 else DB_PATH
+    SQLiteRegistry(target).sync(source)
+    print(target)
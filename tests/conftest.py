@@ -0,0 +1,28 @@
+import copy
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+REGISTRY_JSON = os.path.join(ROOT, 'operando_cell_registry.json')
+
+
+@pytest.fixture
+def records():
+    """A fresh copy of the shipped registry's records."""
+    with open(REGISTRY_JSON, encoding='utf-8') as f:
+        return copy.deepcopy(json.load(f))
+
+
+@pytest.fixture
+def write_registry(tmp_path):
+    """Write records to a registry JSON under ``tmp_path``; returns its path."""
+    def write(records, name='registry.json'):
+        path = tmp_path / name
+        path.write_text(json.dumps(records), encoding='utf-8')
+        return str(path)
+    return write
@@ -0,0 +1,57 @@
+import http.client
+import threading
+
+import pytest
+
+import api
+
+
+@pytest.fixture
+def server(records, write_registry):
+    server = api.make_server(write_registry(records), host='127.0.0.1', port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _get(server, path, **headers):
+    conn = http.client.HTTPConnection(*server.server_address[:2])
+    conn.request('GET', path, headers=headers)
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    return response
+
+
+def test_etag_differs_by_encoding(server):
+    plain = _get(server, '/cells')
+    gzipped = _get(server, '/cells', **{'Accept-Encoding': 'gzip'})
+    assert gzipped.getheader('Content-Encoding') == 'gzip'
+    assert plain.getheader('ETag') != gzipped.getheader('ETag')
+    # Each tag revalidates only its own representation
+    assert _get(server, '/cells', **{'If-None-Match': plain.getheader('ETag')}).status == 304
+    assert _get(server, '/cells', **{'If-None-Match': gzipped.getheader('ETag')}).status == 200
+    assert _get(server, '/cells', **{'If-None-Match': gzipped.getheader('ETag'),
+                                     'Accept-Encoding': 'gzip'}).status == 304
+
+
+@pytest.mark.parametrize('length', ['abc', '-5', '1e3', '12, 12'])
+def test_post_rejects_invalid_content_length(server, length):
+    conn = http.client.HTTPConnection(*server.server_address[:2])
+    conn.putrequest('POST', '/match')
+    conn.putheader('Content-Length', length)
+    conn.endheaders()
+    response = conn.getresponse()
+    assert response.status == 400
+    assert response.getheader('Connection') == 'close'
+    conn.close()
+
+
+def test_post_match(server):
+    conn = http.client.HTTPConnection(*server.server_address[:2])
+    conn.request('POST', '/match', body=b'{"specs": [], "limit": 3}')
+    response = conn.getresponse()
+    response.read()
+    assert response.status == 200
+    conn.close()
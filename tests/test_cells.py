@@ -0,0 +1,40 @@
+import copy
+import json
+
+import pytest
+
+import cells
+
+
+def _round_trips(record):
+    rebuilt = cells.Cell.from_record(record).to_record()
+    return json.dumps(rebuilt) == json.dumps(record)
+
+
+def test_registry_records_round_trip_without_raw(records):
+    for record in records:
+        cell = cells.Cell.from_record(record)
+        assert cell.raw is None
+        assert _round_trips(record)
+
+
+@pytest.mark.parametrize('edit', [
+    lambda r: r.update(extra=1),
+    lambda r: r.update(contact_info=None),
+    lambda r: r['compatibility'].update(notes='x'),
+    lambda r: r.update(compatibility={'techniques': r['compatibility']['techniques'],
+                                      'instruments': r['compatibility']['instruments']}),
+    lambda r: r['compatibility'].pop('instruments'),
+    lambda r: r['specifications'].update(window_materials='Kapton'),
+    lambda r: r['specifications'].update(operating_limits=None),
+    lambda r: r.update(limitations_3r={'reliability': 'one phrase'}),
+    lambda r: r.update(contact_info={'primary_email': None}),
+    lambda r: r.update(digital_twin={'cad_available': None}),
+    lambda r: r.update(digital_twin={}),
+])
+def test_off_schema_records_keep_their_original(records, edit):
+    record = copy.deepcopy(records[0])
+    edit(record)
+    cell = cells.Cell.from_record(record)
+    assert cell.raw == record
+    assert _round_trips(record)
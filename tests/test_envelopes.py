@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+import envelopes
+
+
+class _Cell:
+    def __init__(self, **limits):
+        self.operating_limits = tuple(limits.items())
+
+    def limit(self, name, default=None):
+        return dict(self.operating_limits).get(name, default)
+
+
+def _random_boxes(rng, n_rows, n_axes):
+    lows = rng.uniform(0, 100, (n_rows, n_axes))
+    highs = lows + rng.uniform(0, 50, (n_rows, n_axes))
+    # Some open ends and some unknown axes
+    lows[rng.random((n_rows, n_axes)) < 0.1] = -np.inf
+    highs[rng.random((n_rows, n_axes)) < 0.1] = np.inf
+    unknown = rng.random((n_rows, n_axes)) < 0.1
+    lows[unknown] = highs[unknown] = np.nan
+    return lows, highs
+
+
+def _brute_force(lows, highs, columns, planned, contains):
+    mask = np.ones(len(lows), dtype=bool)
+    for column, (low, high) in zip(columns, planned):
+        # An open planned end is not constrained; unknown (NaN) rows still fail
+        if contains:
+            mask &= lows[:, column] <= (np.inf if low is None else low)
+            mask &= highs[:, column] >= (-np.inf if high is None else high)
+        else:
+            mask &= lows[:, column] <= (np.inf if high is None else high)
+            mask &= highs[:, column] >= (-np.inf if low is None else low)
+    return mask
+
+
+@pytest.mark.parametrize('n_rows', [0, 1, envelopes.FANOUT, envelopes.FANOUT + 1, 1000])
+@pytest.mark.parametrize('n_axes', [1, 3])
+def test_search_matches_brute_force(n_rows, n_axes):
+    rng = np.random.default_rng(n_rows * 10 + n_axes)
+    lows, highs = _random_boxes(rng, n_rows, n_axes)
+    axes = [f'axis_{i}' for i in range(n_axes)]
+    index = envelopes.EnvelopeIndex(axes, lows, highs)
+    for _ in range(50):
+        columns = sorted(rng.choice(n_axes, rng.integers(1, n_axes + 1), replace=False))
+        planned = []
+        for _column in columns:
+            low, high = sorted(rng.uniform(0, 150, 2))
+            if rng.random() < 0.2:
+                low = None
+            elif rng.random() < 0.2:
+                high = low
+            planned.append((low, high))
+        conditions = {axes[c]: p for c, p in zip(columns, planned)}
+        assert (index.containing(conditions) == _brute_force(lows, highs, columns, planned, True)).all()
+        assert (index.overlapping(conditions) == _brute_force(lows, highs, columns, planned, False)).all()
+
+
+def test_empty_conditions_match_every_row():
+    index = envelopes.EnvelopeIndex(['temp_c'], [[0.0], [np.nan]], [[10.0], [np.nan]])
+    assert index.containing({}).all()
+    assert index.overlapping({}).all()
+
+
+def test_by_row_undoes_leaf_order():
+    rng = np.random.default_rng(0)
+    lows, highs = _random_boxes(rng, 200, 2)
+    by_row = envelopes.EnvelopeIndex(['a', 'b'], lows, highs).by_row()
+    np.testing.assert_array_equal(by_row[0], lows)
+    np.testing.assert_array_equal(by_row[1], highs)
+
+
+@pytest.mark.parametrize('name, pair, expected', [
+    ('max_temp_c', False, ('temp_c', 'high')),
+    ('min_pressure_bar', False, ('pressure_bar', 'low')),
+    ('voltage_window_v', True, ('voltage_v', 'both')),
+    ('temp_range_c', True, ('temp_c', 'both')),
+    ('current_ma', False, ('current_ma', 'point')),
+])
+def test_axis_of(name, pair, expected):
+    assert envelopes.axis_of(name, pair) == expected
+
+
+def test_envelopes_from_limits():
+    cells = [
+        _Cell(max_temp_c=80, voltage_window_v=[0, 4.5], pressure_control=True),
+        _Cell(min_temp_c=-20, max_temp_c=60),
+        _Cell(current_ma=5),
+        _Cell(),
+    ]
+    names = ['max_temp_c', 'min_temp_c', 'voltage_window_v', 'current_ma', 'pressure_control']
+    axes, lows, highs = envelopes.envelopes(cells, names, defaults={'max_temp_c': 25})
+    assert axes == ('current_ma', 'temp_c', 'voltage_v')
+    temp, voltage, current = axes.index('temp_c'), axes.index('voltage_v'), axes.index('current_ma')
+    # Stated at one end only: open at the other
+    assert (lows[0, temp], highs[0, temp]) == (-np.inf, 80)
+    assert (lows[1, temp], highs[1, temp]) == (-20, 60)
+    # Defaulted where unstated
+    assert (lows[3, temp], highs[3, temp]) == (-np.inf, 25)
+    assert (lows[0, voltage], highs[0, voltage]) == (0, 4.5)
+    assert np.isnan(lows[1, voltage]) and np.isnan(highs[1, voltage])
+    assert (lows[2, current], highs[2, current]) == (5, 5)
@@ -0,0 +1,50 @@
+import csv
+import io
+
+import numpy as np
+import pytest
+
+import export
+import registry
+
+
+@pytest.fixture
+def reg(records, write_registry):
+    return registry.Registry.load(write_registry(records))
+
+
+def _first(reg, n_rows):
+    mask = np.zeros(len(reg), dtype=bool)
+    mask[:n_rows] = True
+    return mask
+
+
+@pytest.mark.parametrize('fmt', sorted(export.FORMATS))
+@pytest.mark.parametrize('n_rows', [0, 3])
+def test_exports_leave_the_column_cache_empty(reg, fmt, n_rows):
+    export.spool(reg, _first(reg, n_rows), fmt).read()
+    assert reg._column_cache == {}
+
+
+def test_csv_rows(reg, monkeypatch):
+    monkeypatch.setattr(export, 'CHUNK_ROWS', 2)
+    rows = list(csv.DictReader(io.StringIO(export.spool(reg, _first(reg, 5), 'CSV').read().decode())))
+    assert [row['id'] for row in rows] == [c.id for c in reg.cells[:5]]
+    assert rows[0]['compatibility.instruments'] == '; '.join(reg.cells[0].instruments)
+
+
+def test_empty_csv_has_the_header(reg):
+    assert export.spool(reg, _first(reg, 0), 'CSV').read().decode().strip().split(',') == list(reg.columns)
+
+
+def test_parquet_with_a_mixed_type_limit(records, write_registry):
+    pq = pytest.importorskip('pyarrow.parquet')
+    for record, pressure in zip(records, ('ambient', 5, 2.5)):
+        record['specifications']['operating_limits']['max_pressure_bar'] = pressure
+    reg = registry.Registry.load(write_registry(records))
+    table = pq.read_table(export.spool(reg, reg.all_rows(), 'Parquet'))
+    column = 'specifications.operating_limits.max_pressure_bar'
+    assert str(table.schema.field(column).type) == 'string'
+    assert table.column(column).to_pylist()[:4] == ['ambient', '5', '2.5', None]
+    assert str(table.schema.field('specifications.operating_limits.max_temp_c').type) == 'double'
+    assert table.column('id').to_pylist() == [c.id for c in reg.cells]
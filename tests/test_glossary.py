@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+import glossary
+import registry
+
+
+def _naive_longest(terms, text):
+    """The longest term that is a substring of ``text``, the leftmost if
+    several are that long: what :class:`glossary.Matcher` must agree with."""
+    folded = text.casefold()
+    found = [(len(term), -folded.find(term.casefold()), term) for term in terms if term.casefold() in folded]
+    return max(found)[2] if found else None
+
+
+@pytest.mark.parametrize('name, term', [
+    ('XRD-CT', 'XRD-CT'),
+    ('Operando XRD', 'XRD'),
+    ('NEXAFS', 'NEXAFS'),
+    ('EXAFS', 'EXAFS'),
+    ('Hard X-ray XAS (Fluorescence)', 'XAS'),
+    ('ap-xps', 'AP-XPS'),
+    ('Neutron Diffraction and SANS', 'Neutron Diffraction'),
+    ('Raman', None),
+    ('', None),
+])
+def test_longest_glossary_term(name, term):
+    assert glossary.Matcher(glossary.TECHNIQUE_DEFINITIONS).longest(name) == term
+
+
+def test_overlapping_terms():
+    matcher = glossary.Matcher(['he', 'she', 'his', 'hers'])
+    assert matcher.longest('ushers') == 'hers'
+    assert matcher.longest('ushe') == 'she'
+    assert matcher.longest('this he') == 'his'
+    # Equal lengths: the one occurring first
+    assert matcher.longest('she his') == 'she'
+    assert matcher.longest('xyz') is None
+
+
+def test_resolve_omits_names_without_a_term():
+    names = ['XRD-CT', 'Raman', 'Soft XPS (TEY)']
+    assert glossary.resolve(names) == {'XRD-CT': 'XRD-CT', 'Soft XPS (TEY)': 'Soft XPS'}
+
+
+def test_matches_naive_scan():
+    rng = random.Random(0)
+    for _ in range(200):
+        terms = list({''.join(rng.choices('abc', k=rng.randint(1, 4))) for _ in range(rng.randint(1, 8))})
+        matcher = glossary.Matcher(terms)
+        for _ in range(20):
+            text = ''.join(rng.choices('abcABd', k=rng.randint(0, 12)))
+            assert matcher.longest(text) == _naive_longest(terms, text), (terms, text)
+
+
+def test_shipped_names_match_naive_scan(records, write_registry):
+    reg = registry.Registry.load(write_registry(records))
+    for name in reg.techniques.terms:
+        assert glossary.Matcher(glossary.TECHNIQUE_DEFINITIONS).longest(name) == \
+            _naive_longest(glossary.TECHNIQUE_DEFINITIONS, name)
@@ -0,0 +1,109 @@
+import math
+
+import pytest
+
+import matching
+import registry
+
+
+@pytest.fixture
+def reg(records, write_registry):
+    return registry.Registry.load(write_registry(records))
+
+
+def _ids(reg, spec, limit=10):
+    [ranked] = matching.match_requirements(reg, [spec], limit)
+    return [(result['id'], result['score']) for result in ranked]
+
+
+@pytest.mark.parametrize('text', ['18mm diameter', '18 mm diameter', '18mm dia.', 'Ø 1.8 cm'])
+def test_sample_size_matches_parsed_dimensions(reg, text):
+    assert _ids(reg, {'sample_size': text}) == [(c.id, 1.0) for c in reg.cells if c.sample_size == '18mm diameter']
+
+
+def test_sample_size_scores_the_fraction_of_dimensions_met(reg):
+    # The 2x4cm aperture overlaps a 20 mm width but not a 10 mm height
+    aperture = next(c.id for c in reg.cells if c.sample_size == '2x4cm aperture')
+    assert (aperture, 0.5) in _ids(reg, {'sample_size': '20x10mm'})
+
+
+def test_unparsed_sample_size_falls_back_to_text(reg):
+    expected = [(c.id, 1.0) for c in reg.cells if c.sample_size == 'Variable']
+    assert expected and _ids(reg, {'sample_size': ' variable '}) == expected
+
+
+@pytest.mark.parametrize('weight', [math.inf, math.nan, -1, True, '1'])
+def test_invalid_weights_are_rejected(reg, weight):
+    with pytest.raises(ValueError, match='finite non-negative'):
+        matching.match_requirements(reg, [{'temperature_c': 50, 'weights': {'temperature_c': weight}}])
+
+
+def test_all_zero_weights_are_rejected(reg):
+    spec = {'temperature_c': 50, 'pressure_control': True,
+            'weights': {'temperature_c': 0, 'pressure_control': 0, 'techniques': 3}}
+    with pytest.raises(ValueError, match='all be zero'):
+        matching.match_requirements(reg, [spec])
+    # One stated criterion weighted above zero is enough
+    spec['weights']['pressure_control'] = 0.5
+    assert matching.match_requirements(reg, [spec])[0]
+
+
+@pytest.fixture
+def small(records, write_registry):
+    cells = [
+        ('A', ['XRD', 'XAS'], 100, True, ['Kapton']),
+        ('B', ['XRD'], 200, False, ['Kapton', 'Beryllium']),
+        ('C', ['XANES'], 50, True, ['Beryllium']),
+        ('D', ['SANS'], 20, False, ['Quartz']),
+    ]
+    for record, (name, techniques, max_temp, pressure, windows) in zip(records, cells):
+        record.update(id=name, name=f'Cell {name}')
+        record['compatibility']['techniques'] = techniques
+        record['specifications']['operating_limits'] = {'max_temp_c': max_temp, 'pressure_control': pressure}
+        record['specifications']['window_materials'] = windows
+    return registry.Registry.load(write_registry(records[:len(cells)]))
+
+
+SPEC = {'techniques': ['XRD', 'XAS'], 'temperature_c': 80, 'pressure_control': True, 'window_materials': ['Kapton']}
+
+
+def test_ranking_order_and_breakdown(small):
+    [ranked] = matching.match_requirements(small, [SPEC])
+    # D meets nothing, so it is left out; C's XANES counts as XAS
+    assert [(r['id'], r['score']) for r in ranked] == [('A', 1.0), ('B', 0.5), ('C', 0.375)]
+    assert ranked[1]['name'] == 'Cell B'
+    assert ranked[1]['breakdown'] == {'techniques': 0.5, 'temperature_c': 1.0, 'pressure_control': 0.0,
+                                      'window_materials': 0.5}
+    assert ranked[2]['breakdown'] == {'techniques': 0.5, 'temperature_c': 0.0, 'pressure_control': 1.0,
+                                      'window_materials': 0.0}
+
+
+def test_weights_reorder_the_ranking(small):
+    spec = {**SPEC, 'weights': {'pressure_control': 3}}
+    assert _ids(small, spec) == [('A', 1.0), ('C', pytest.approx(3.5 / 6, abs=1e-4)),
+                                 ('B', pytest.approx(2 / 6, abs=1e-4))]
+
+
+@pytest.mark.parametrize('limit, expected', [(1, ['A']), (2, ['A', 'B']), (3, ['A', 'B', 'C']), (10, ['A', 'B', 'C'])])
+def test_limit_truncates_the_ranking(small, limit, expected):
+    assert [cell_id for cell_id, _ in _ids(small, SPEC, limit)] == expected
+
+
+def test_one_result_list_per_spec(small):
+    results = matching.match_requirements(small, [SPEC, {'techniques': ['SANS']}, {}], limit=2)
+    assert [[r['id'] for r in ranked] for ranked in results] == [['A', 'B'], ['D'], ['A', 'B']]
+    # A spec stating nothing has nothing to break down
+    assert results[2][0]['breakdown'] == {}
+
+
+def test_rank(small):
+    frame = matching.rank(small, SPEC)
+    assert list(frame.columns) == ['id', 'name', 'score', 'techniques', 'temperature_c',
+                                   'pressure_control', 'window_materials']
+    assert frame['id'].tolist() == ['A', 'B', 'C']
+    assert frame['score'].tolist() == pytest.approx([1.0, 0.5, 0.375])
+    assert frame['temperature_c'].tolist() == [1.0, 1.0, 0.0]
+    # Masked out cells are never ranked, and limit truncates
+    mask = small.ids != 'A'
+    assert matching.rank(small, SPEC, mask=mask)['id'].tolist() == ['B', 'C']
+    assert matching.rank(small, SPEC, limit=1)['id'].tolist() == ['A']
@@ -0,0 +1,32 @@
+import gc
+import tracemalloc
+
+import profiling
+
+
+def test_finish_stops_tracing(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, 'LOG_PATH', str(tmp_path / 'reruns.jsonl'))
+    monkeypatch.setattr(profiling, '_logger', None)
+    profile = profiling.RerunProfile(True)
+    profile.lap('load')
+    profile.finish()
+    assert not tracemalloc.is_tracing()
+    del profile
+    gc.collect()
+    assert profiling._tracing_reruns == 0
+
+
+def test_abandoned_profile_stops_tracing():
+    # e.g. a rerun interrupted by a newer one, or by st.stop()
+    profile = profiling.RerunProfile(True)
+    profile.lap('load')
+    assert tracemalloc.is_tracing()
+    del profile
+    gc.collect()
+    assert not tracemalloc.is_tracing()
+    assert profiling._tracing_reruns == 0
+
+
+def test_disabled_profile_never_traces():
+    profiling.RerunProfile(False).finish()
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,45 @@
+import pytest
+
+import query_backends
+import registry
+
+
+@pytest.fixture
+def reg(records, write_registry):
+    # Stated for a few cells only, with no default: unknown (NaN) elsewhere
+    for record, pressure in zip(records, (2, 10, 50)):
+        record['specifications']['operating_limits']['max_pressure_bar'] = pressure
+    return registry.Registry.load(write_registry(records))
+
+
+@pytest.fixture(params=['sqlite', 'duckdb'])
+def backend(request, reg, tmp_path):
+    if request.param == 'duckdb':
+        pytest.importorskip('duckdb')
+        pytest.importorskip('pyarrow')
+        return query_backends.DuckDBBackend(reg)
+    return query_backends.SQLiteBackend(reg, str(tmp_path / 'registry.sqlite'))
+
+
+FILTERS = [
+    {},
+    {'limit_ranges': {'max_pressure_bar': (5, None)}},
+    {'limit_ranges': {'max_pressure_bar': (None, 20)}},
+    {'limit_ranges': {'max_pressure_bar': (None, None)}},
+    {'limit_ranges': {'max_pressure_bar': (5, 100), 'max_temp_c': (None, 100)}},
+    {'limit_ranges': {'max_temp_c': (None, None)}, 'cad_only': True},
+    {'high_temp_only': True, 'pressure_only': True},
+]
+
+
+@pytest.mark.parametrize('filters', FILTERS)
+def test_backends_match_memory(reg, backend, filters):
+    memory = query_backends.MemoryBackend(reg)
+    assert (backend.filter(**filters) == memory.filter(**filters)).all()
+    for facet in ('techniques', 'instruments'):
+        assert backend.facet_counts(facet, **filters) == memory.facet_counts(facet, **filters)
+
+
+def test_unknown_limits_never_match(reg, backend):
+    assert backend.filter(limit_ranges={'max_pressure_bar': (5, None)}).sum() == 2
+    assert backend.filter(limit_ranges={'max_pressure_bar': (None, None)}).sum() == 3
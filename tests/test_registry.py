@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+import matching
+import registry
+
+
+@pytest.mark.parametrize('n_records', [0, 3])
+def test_defaulted_limits_are_indexed_when_unstated(records, write_registry, n_records):
+    records = records[:n_records]
+    for record in records:
+        record['specifications']['operating_limits'].pop('max_temp_c', None)
+    reg = registry.Registry.load(write_registry(records))
+    default = registry.LIMIT_DEFAULTS['max_temp_c']
+    assert (reg.limits['max_temp_c'].by_row() == default).all()
+    assert not reg.high_temp.any()
+    assert reg.filter(limit_ranges={'max_temp_c': (0, default)}).sum() == n_records
+    # Every cell reaches the default, so each one meets the requirement
+    [ranked] = matching.match_requirements(reg, [{'temperature_c': default}], 3)
+    assert len(ranked) == n_records
+
+
+def test_non_numeric_limits_are_not_indexed(records, write_registry):
+    records[0]['specifications']['operating_limits']['max_pressure_bar'] = 'ambient'
+    records[1]['specifications']['operating_limits']['max_pressure_bar'] = 5
+    reg = registry.Registry.load(write_registry(records))
+    assert 'max_pressure_bar' not in reg.limits
+    assert np.isnan(reg.limits['max_temp_c'].by_row()).sum() == 0
+
+
+@pytest.mark.parametrize('edit', [
+    lambda records: records,
+    lambda records: [],
+    # An item holding the list separator is read row by row
+    lambda records: [{**records[0], 'compatibility': {'instruments': ['a\x1fb'], 'techniques': ['XAS']}},
+                     {**records[1], 'compatibility': {'instruments': ['a', 'b'], 'techniques': ['XAS']}}],
+    # Off-schema records keep their original
+    lambda records: [{**records[0], 'extra': [1, 2]}, {**records[1], 'limitations_3r': None}] + records[2:],
+])
+def test_snapshot_round_trip(records, write_registry, edit):
+    pytest.importorskip('pyarrow')
+    records = edit(records)
+    path = write_registry(records)
+    parsed = registry.parse_registry(path)
+    read = registry.read_snapshot(registry.write_snapshot(path, parsed))
+    assert len(read) == len(parsed)
+    for cell, original in zip(read, parsed):
+        assert cell.same(original)
+    assert [cell.to_record() for cell in read] == records
+
+
+def _random_values(n_rows, seed):
+    rng = np.random.default_rng(seed)
+    vocab = [f't{i}' for i in range(12)]
+    return [tuple(rng.choice(vocab, rng.integers(0, 5), replace=False).tolist()) for _ in range(n_rows)]
+
+
+@pytest.mark.parametrize('n_rows', [0, 1, 7, 8, 9, 70])
+def test_facet_index_matches_brute_force(n_rows):
+    values = _random_values(n_rows, n_rows)
+    index = registry.FacetIndex(values)
+    assert index.terms == sorted({t for terms in values for t in terms})
+    np.testing.assert_array_equal(index.sizes(), [len(terms) for terms in values])
+    rng = np.random.default_rng(n_rows)
+    for selected in ([], ['t0'], ['t1', 't2', 't2'], ['unknown'], ['t3', 'unknown'], index.terms):
+        expected = [any(t in terms for t in selected) for terms in values]
+        np.testing.assert_array_equal(index.mask(selected), np.array(expected, dtype=bool))
+    for mask in (np.zeros(n_rows, dtype=bool), np.ones(n_rows, dtype=bool), rng.random(n_rows) < 0.5):
+        expected = [sum(t in terms for terms, m in zip(values, mask) if m) for t in index.terms]
+        np.testing.assert_array_equal(index.counts(mask), expected)
+        expected = [[t in terms for t in index.terms] for terms, m in zip(values, mask) if m]
+        np.testing.assert_array_equal(index.matrix(mask), np.array(expected, dtype=bool).reshape(len(expected), len(index.terms)))
+
+
+def test_facet_index_skips_missing_lists():
+    index = registry.FacetIndex([('a', 'b'), None, ('b',), np.nan])
+    assert index.terms == ['a', 'b']
+    np.testing.assert_array_equal(index.sizes(), [2, 0, 1, 0])
+    np.testing.assert_array_equal(index.mask(['b']), [True, False, True, False])
+    np.testing.assert_array_equal(index.counts(np.array([True, True, False, True])), [1, 1])
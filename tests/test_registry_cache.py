@@ -0,0 +1,70 @@
+import json
+import os
+import subprocess
+import sys
+
+import registry
+from conftest import ROOT
+
+
+def test_cache_round_trip(tmp_path, records, write_registry):
+    path = write_registry(records)
+    built = registry.Registry.load(path)
+    cached = registry.read_cache(path, registry.content_hash(path))
+    assert cached is not None
+    assert list(cached.ids) == list(built.ids)
+    assert (cached.filter(high_temp_only=True) == built.filter(high_temp_only=True)).all()
+
+
+def test_cache_misses_when_derivation_changes(tmp_path, records, write_registry, monkeypatch):
+    path = write_registry(records)
+    registry.Registry.load(path)
+    digest = registry.content_hash(path)
+    assert registry.read_cache(path, digest) is not None
+    monkeypatch.setattr(registry, 'HIGH_TEMP_C', registry.HIGH_TEMP_C + 50)
+    monkeypatch.setattr(registry, '_DERIVATION', None)
+    assert registry.read_cache(path, digest) is None
+    # Rebuilt with the edited threshold rather than served stale
+    reloaded = registry.Registry.load(path)
+    assert (reloaded.high_temp == reloaded.limits['max_temp_c'].mask(registry.HIGH_TEMP_C)).all()
+
+
+def test_merges_sharing_a_first_source_keep_their_caches(tmp_path, records, write_registry):
+    first = write_registry(records[:2], 'first.json')
+    merges = [[first, write_registry(records[2:4], 'second.json')],
+              [first, write_registry(records[4:6], 'third.json')]]
+    assert registry.cache_root(merges[0]) != registry.cache_root(merges[1])
+    for sources in merges:
+        registry.Registry.load(sources)
+    for sources in merges:
+        assert registry.read_cache(sources, registry.content_hash(sources)) is not None
+
+
+def test_cache_built_by_the_script_is_readable(tmp_path, records, write_registry):
+    path = write_registry(records)
+    subprocess.run([sys.executable, os.path.join(ROOT, 'registry.py'), path], cwd=tmp_path, check=True,
+                   capture_output=True)
+    cached = registry.read_cache(path, registry.content_hash(path))
+    assert cached is not None
+    assert type(cached) is registry.Registry
+
+
+def test_streamed_sources_split_the_load_workers(tmp_path, records, write_registry, monkeypatch):
+    sources = [write_registry(records[:4])]
+    for name, chunk in (('a.ndjson', records[4:7]), ('b.jsonl', records[7:])):
+        (tmp_path / name).write_text(''.join(json.dumps(record) + '\n' for record in chunk), encoding='utf-8')
+        sources.append(str(tmp_path / name))
+    assert registry.split_workers(sources, 5) == [1, 3, 2]
+    assert registry.split_workers(sources, 1) == [1, 1, 1]
+
+    parsed = {}
+    parse = registry.parse_registry
+
+    def recording(path, workers=None):
+        parsed[path] = workers
+        return parse(path, workers)
+    monkeypatch.setattr(registry.ingest, 'WORKERS', 4)
+    monkeypatch.setattr(registry, 'parse_registry', recording)
+    cells, conflicts = registry.load_sources(sources)
+    assert parsed == dict(zip(sources, [1, 2, 2]))
+    assert [cell.id for cell in cells] == [record['id'] for record in records] and not conflicts
@@ -0,0 +1,86 @@
+import importlib
+import types
+
+import numpy as np
+import pytest
+
+import result_cache
+
+
+def _reg(digest='a' * 64):
+    return types.SimpleNamespace(digest=digest)
+
+
+def _counting(value):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return value
+    return compute, calls
+
+
+def test_equivalent_states_normalize_to_one_key():
+    a = result_cache.normalize_filters(techniques=['XRD', 'XAS', 'XRD'], instruments=('B18',),
+                                       cad_only=1, limit_ranges={'b': (1, 2), 'a': (None, 3)})
+    b = result_cache.normalize_filters(techniques=('XAS', 'XRD'), instruments=['B18', 'B18'],
+                                       cad_only=True, limit_ranges={'a': (None, 3), 'b': (1, 2)})
+    assert a == b
+    assert result_cache.filter_key(a) == result_cache.filter_key(b)
+    assert result_cache.filter_key(a) != result_cache.filter_key(result_cache.normalize_filters(techniques=['XAS']))
+
+
+def test_hits_share_one_frozen_array():
+    cache = result_cache.ResultCache()
+    filters = result_cache.normalize_filters(techniques=['XAS'])
+    compute, calls = _counting(np.ones(10, dtype=bool))
+    first = cache.get(_reg(), 'mask', filters, compute)
+    again = cache.get(_reg(), 'mask', result_cache.normalize_filters(techniques=['XAS', 'XAS']), compute)
+    assert again is first and len(calls) == 1
+    assert not first.flags.writeable
+    with pytest.raises(ValueError):
+        first[0] = False
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_least_recently_used_is_evicted_within_budget():
+    cache = result_cache.ResultCache(budget_bytes=250)
+    states = [result_cache.normalize_filters(techniques=[name]) for name in 'abc']
+    for filters in states[:2]:
+        cache.get(_reg(), 'mask', filters, lambda: np.zeros(100, dtype=np.uint8))
+    cache.get(_reg(), 'mask', states[0], lambda: pytest.fail("should be cached"))  # a is now newest
+    cache.get(_reg(), 'mask', states[2], lambda: np.zeros(100, dtype=np.uint8))
+    assert cache.stats()['entries'] == 2 and cache.stats()['nbytes'] <= 250
+    compute, calls = _counting(np.zeros(100, dtype=np.uint8))
+    cache.get(_reg(), 'mask', states[0], compute)
+    assert not calls
+    cache.get(_reg(), 'mask', states[1], compute)  # b was evicted
+    assert calls
+    # A result over the whole budget is returned but never cached
+    cache.get(_reg(), 'mask', states[0], lambda: np.zeros(1000, dtype=np.uint8))
+    assert cache.stats()['nbytes'] <= 250
+
+
+def test_new_digest_clears_the_cache():
+    cache = result_cache.ResultCache()
+    filters = result_cache.normalize_filters()
+    cache.get(_reg('a' * 64), 'mask', filters, lambda: np.ones(4, dtype=bool))
+    compute, calls = _counting(np.zeros(4, dtype=bool))
+    assert not cache.get(_reg('b' * 64), 'mask', filters, compute).any()
+    assert calls and cache.stats()['entries'] == 1
+
+
+def test_zero_budget_disables_the_cache(monkeypatch):
+    monkeypatch.setenv('OPERANDO_RESULT_CACHE_MB', '0')
+    try:
+        module = importlib.reload(result_cache)
+        cache = module.ResultCache()
+        compute, calls = _counting(np.ones(4, dtype=bool))
+        filters = module.normalize_filters()
+        for _ in range(3):
+            cache.get(_reg(), 'mask', filters, compute)
+        assert len(calls) == 3
+        assert cache.stats()['entries'] == 0
+    finally:
+        monkeypatch.delenv('OPERANDO_RESULT_CACHE_MB')
+        importlib.reload(result_cache)
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+import registry
+import sample_sizes
+
+
+@pytest.mark.parametrize('text, dimensions, confidence', [
+    # The shipped registry's sample sizes
+    ('2x4cm aperture', {'width_mm': (20, 20), 'height_mm': (40, 40)}, 'stated'),
+    ('18mm diameter', {'diameter_mm': (18, 18)}, 'stated'),
+    ('2.9mm ID', {'inner_diameter_mm': (2.9, 2.9)}, 'stated'),
+    ('3-12mm electrode', {'diameter_mm': (3, 12)}, 'inferred'),
+    ('2032 Standard', {'diameter_mm': (20, 20)}, 'inferred'),
+    ('Coin-type stack', {}, 'none'),
+    ('Variable', {}, 'none'),
+    ('Flexible', {}, 'none'),
+    (None, {}, 'none'),
+    # Units, ranges and keywords before the size
+    ('2 cm x 4 cm window', {'width_mm': (20, 20), 'height_mm': (40, 40)}, 'stated'),
+    ('5 to 8 mm OD', {'diameter_mm': (5, 8)}, 'stated'),
+    ('Ø 10 mm', {'diameter_mm': (10, 10)}, 'stated'),
+    ('inner diameter 3mm', {'inner_diameter_mm': (3, 3)}, 'stated'),
+    ('500 um thick', {}, 'none'),
+    # Several sizes: each keyword qualifies its own size only
+    ('10mm long capillary, 1mm ID', {'inner_diameter_mm': (1, 1)}, 'stated'),
+    ('10mm long 1mm ID capillary', {'inner_diameter_mm': (1, 1)}, 'stated'),
+    ('electrode 12mm, 50um thick', {'diameter_mm': (12, 12)}, 'inferred'),
+    ('diameter 12mm 5mm thick', {'diameter_mm': (12, 12)}, 'stated'),
+    ('18mm diameter, 2mm', {'diameter_mm': (18, 18)}, 'stated'),
+    ('12mm diameter, 15mm diameter', {'diameter_mm': (12, 15)}, 'inferred'),
+])
+def test_parse(text, dimensions, confidence):
+    parsed, parsed_confidence = sample_sizes.parse(text)
+    assert parsed == pytest.approx(dimensions)
+    assert parsed.keys() == dimensions.keys()
+    assert parsed_confidence == confidence
+
+
+def test_describe():
+    assert sample_sizes.describe({'diameter_mm': (3.0, 12.0)}) == 'diameter 3–12 mm'
+    assert sample_sizes.describe({'inner_diameter_mm': (2.9, 2.9)}) == 'inner diameter 2.9 mm'
+
+
+def test_registry_confidence_flags(records, write_registry):
+    sizes = ['2032 Standard', 'Variable', '18mm diameter']
+    for record, size in zip(records, sizes):
+        record['specifications']['sample_size'] = size
+    reg = registry.Registry.load(write_registry(records))
+    assert reg.sample_confidence[:3].tolist() == ['inferred', 'none', 'stated']
+    assert reg.parsed_sample_sizes['Variable'] == ({}, 'none')
+    # An inferred size filters like a stated one; a size with none never matches
+    matched = np.flatnonzero(reg.filter(sample_ranges={'diameter_mm': (15, 25)}))
+    assert 0 in matched and 2 in matched
+    assert 1 not in np.flatnonzero(reg.filter(sample_ranges={'diameter_mm': (None, None)}))
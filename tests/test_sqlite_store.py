@@ -0,0 +1,29 @@
+import registry
+import sqlite_store
+
+
+def test_sync_reingests_a_reverted_version(tmp_path, records, write_registry):
+    store = sqlite_store.SQLiteRegistry(str(tmp_path / 'store.sqlite'))
+    original = [dict(r) for r in records]
+    edited = [dict(r) for r in records]
+    edited[0]['digital_twin'] = {**edited[0]['digital_twin'], 'cad_available': False}
+    path = str(tmp_path / 'registry.json')
+
+    for version in (original, edited, original):  # A -> B -> A
+        write_registry(version)
+        store.sync(path)
+        reg = registry.Registry(registry.load_registry(path), source=path)
+        assert store.current_source() == registry.content_hash(path)
+        assert sorted(store.filter_ids(cad_only=True)) == sorted(reg.ids[reg.cad_available])
+
+    assert records[0]['digital_twin']['cad_available'] is True
+    versions = [record['digital_twin']['cad_available'] for _, record in store.history(records[0]['id'])]
+    assert versions == [True, False, True]
+
+
+def test_sync_skips_the_current_version(tmp_path, records, write_registry):
+    store = sqlite_store.SQLiteRegistry(str(tmp_path / 'store.sqlite'))
+    path = write_registry(records)
+    store.sync(path)
+    store.sync(path)
+    assert len(store.history(records[0]['id'])) == 1
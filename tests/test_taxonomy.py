@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+import glossary
+import registry
+
+XAS_FAMILY = ['XAS', 'Hard X-ray XAS (Fluorescence)', 'XANES', 'EXAFS', 'NEXAFS']
+
+
+@pytest.fixture
+def reg(records, write_registry):
+    techniques = XAS_FAMILY + ['XRD-CT', 'XRD', 'Raman']
+    for record, technique in zip(records, techniques):
+        record['compatibility']['techniques'] = [technique]
+    for record in records[len(techniques):]:
+        record['compatibility']['techniques'] = ['SANS']
+    return registry.Registry.load(write_registry(records))
+
+
+def _names(reg, mask):
+    return [reg.cells[i].techniques[0] for i in np.flatnonzero(mask)]
+
+
+def test_families():
+    assert glossary.families(['Hard X-ray XAS (Fluorescence)', 'NEXAFS', 'EXAFS', 'Raman']) == {
+        'Hard X-ray XAS (Fluorescence)': ('XAS',),
+        'NEXAFS': ('NEXAFS', 'XANES', 'XAS'),
+        'EXAFS': ('EXAFS', 'XAS'),
+        'Raman': ('Raman',),
+    }
+
+
+def test_closure_holds_every_ancestor(reg):
+    assert reg.technique_closure['NEXAFS'] == ('NEXAFS', 'XANES', 'XAS')
+    assert reg.technique_closure['XRD-CT'] == ('XRD-CT', 'XRD')
+    for name in XAS_FAMILY:
+        assert 'XAS' in reg.technique_closure[name]
+
+
+def test_parent_selects_its_descendants(reg):
+    assert sorted(_names(reg, reg.filter(technique_families=['XAS']))) == sorted(XAS_FAMILY)
+    assert sorted(_names(reg, reg.filter(technique_families=['XANES']))) == ['NEXAFS', 'XANES']
+    assert _names(reg, reg.filter(technique_families=['NEXAFS'])) == ['NEXAFS']
+    assert sorted(_names(reg, reg.filter(technique_families=['XRD']))) == ['XRD', 'XRD-CT']
+    # Exact technique filtering is unchanged
+    assert _names(reg, reg.filter(techniques=['XAS'])) == ['XAS']
+    assert not reg.filter(technique_families=['Unknown']).any()
+
+
+def test_family_counts_include_descendants(reg):
+    counts = reg.facet_counts('technique_families')
+    assert counts['XAS'] == 5 and counts['XANES'] == 2 and counts['EXAFS'] == 1
+    assert counts['Raman'] == 1
+    assert 'Hard X-ray XAS (Fluorescence)' not in counts
+    # Other filters still apply
+    cad = reg.facet_counts('technique_families', cad_only=True)
+    assert cad['XAS'] == np.count_nonzero(reg.filter(technique_families=['XAS'], cad_only=True))
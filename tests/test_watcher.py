@@ -0,0 +1,82 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import registry
+import watcher
+
+FACETS = ['techniques', 'instruments', 'technique_families', 'window_materials', 'limitation_phrases']
+
+
+def _assert_same_index(patched, fresh):
+    assert patched.terms == fresh.terms and patched.n_rows == fresh.n_rows
+    np.testing.assert_array_equal(patched.bits, fresh.bits)
+    np.testing.assert_array_equal(patched.row_bits, fresh.row_bits)
+
+
+def _assert_same_registry(incremental, fresh):
+    assert incremental.ids.tolist() == fresh.ids.tolist()
+    assert incremental.columns == fresh.columns
+    for name in FACETS:
+        _assert_same_index(getattr(incremental, name), getattr(fresh, name))
+    assert incremental.limits.keys() == fresh.limits.keys()
+    for name, index in fresh.limits.items():
+        np.testing.assert_array_equal(incremental.limits[name].by_row(), index.by_row())
+    for name in ('cad_available', 'pressure_control', 'high_temp', 'sample_confidence'):
+        np.testing.assert_array_equal(getattr(incremental, name), getattr(fresh, name))
+    pd.testing.assert_frame_equal(incremental.frame(), fresh.frame())
+
+
+@pytest.mark.parametrize('reuse', [
+    [0, 1, 2, 3],      # unchanged
+    [3, 2, 1, 0],      # reordered
+    [-1, 0, -1, 2],    # updated and inserted rows
+    [1, 3],            # deleted rows
+    [],
+])
+def test_patched_matches_a_fresh_index(reuse):
+    old = [('a', 'b'), ('b',), (), ('c', 'a')]
+    values = [old[r] if r >= 0 else ('d', 'a') for r in reuse]
+    _assert_same_index(registry.FacetIndex(old).patched(values, reuse), registry.FacetIndex(values))
+
+
+def test_updated_matches_a_fresh_registry(records, write_registry):
+    reg = registry.Registry.load(write_registry(records))
+    edited = records[1:-1] + [dict(records[0], id='cell_new')]
+    edited[0]['compatibility']['techniques'] = ['XRD-CT']
+    edited[1]['specifications']['operating_limits']['max_temp_c'] = 300
+    edited[2], edited[3] = edited[3], edited[2]
+    cells = registry.load_registry(write_registry(edited, 'edited.json'))
+
+    incremental, changes = reg.updated(cells)
+    assert changes == {'inserted': ['cell_new'], 'updated': [edited[0]['id'], edited[1]['id']],
+                       'deleted': [records[0]['id'], records[-1]['id']]}
+    assert incremental.generation == reg.generation + 1
+    # Unchanged cells keep their objects
+    assert incremental.cells[2] is reg.cells[reg.row_by_id[edited[2]['id']]]
+    _assert_same_registry(incremental, registry.Registry(cells))
+
+
+def test_unchanged_reload_leaves_the_shared_registry_alone(records, write_registry):
+    reg = registry.Registry.load(write_registry(records))
+    digest = reg.digest
+    same, changes = reg.updated(registry.load_registry(write_registry(records, 'again.json')))
+    assert not any(changes.values())
+    assert same is not reg and same.techniques is reg.techniques
+    same.digest = 'new'
+    assert reg.digest == digest
+
+
+def test_refresh_of_a_reformatted_file(records, write_registry):
+    path = write_registry(records)
+    reg = registry.Registry.load(path)
+    digest = reg.digest
+    watch = watcher.RegistryWatcher(reg, path, interval=0)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(records, f, indent=2)
+    assert watch.refresh() == {'inserted': [], 'updated': [], 'deleted': []}
+    # The old registry, which sessions may still hold, keeps its digest
+    assert reg.digest == digest
+    assert watch.registry is not reg and watch.registry.digest == registry.content_hash(path)
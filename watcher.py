@@ -0,0 +1,98 @@
+"""Hot reload of the registry when its sources change.
+
+:class:`RegistryWatcher` polls the registry's sources from a daemon thread.
+When one changes, it loads the new version, builds the next
+:class:`registry.Registry` incrementally from the current one with
+:meth:`registry.Registry.updated`, and swaps it in. Sessions already holding
+the old registry keep a consistent read-only view; their next rerun picks up
+the new one. Edits to the registry therefore reach a live deployment without
+a restart or a cold cache for every user.
+
+``OPERANDO_RELOAD_INTERVAL`` sets the polling interval in seconds; ``0``
+turns hot reload off.
+"""
+import logging
+import os
+import threading
+import time
+
+import registry
+
+POLL_INTERVAL_S = float(os.environ.get('OPERANDO_RELOAD_INTERVAL', 2))
+
+log = logging.getLogger('operando.watcher')
+
+
+def source_stamp(path):
+    """A cheap change marker for a registry source, from file metadata."""
+    if isinstance(path, (list, tuple)):
+        return tuple(source_stamp(source) for source in path)
+    if os.path.isdir(path):
+        return registry.content_hash(path)  # already metadata-only for shards
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class RegistryWatcher:
+    """Holds the current registry and replaces it when its sources change."""
+
+    def __init__(self, reg, path=None, interval=POLL_INTERVAL_S):
+        self.registry = reg
+        self.path = path or reg.source or registry.REGISTRY_PATH
+        self.interval = interval
+        self.changes = None  # what the last reload changed
+        self._stamp = source_stamp(self.path)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def refresh(self):
+        """Reload now if the sources changed since the last check.
+
+        Returns the ``changes`` applied (see
+        :meth:`registry.Registry.updated`), or ``None`` if there was nothing
+        to reload or the new version could not be read.
+        """
+        with self._lock:
+            stamp = source_stamp(self.path)
+            if stamp == self._stamp:
+                return None
+            # Recorded up front: a broken version is retried only once it changes again
+            self._stamp = stamp
+            try:
+                digest = registry.content_hash(self.path)
+                if isinstance(self.path, (list, tuple)):
+                    cells, conflicts = registry.load_sources(self.path)
+                else:
+                    cells, conflicts = registry.load_registry(self.path), ()
+            except (OSError, ValueError) as exc:  # e.g. a half-written file
+                log.warning("Registry reload failed; still serving the previous version: %s", exc)
+                return None
+
+            reg, self.changes = self.registry.updated(cells, conflicts)
+            reg.digest = digest  # before it is shared, so result caches see the new version
+            self.registry = reg
+            try:
+                # So that a restarted replica starts from this version, warm
+                registry.write_cache(self.registry, self.path, digest)
+            except registry.CACHE_ERRORS:
+                pass
+            log.info("Registry reloaded: %s", {kind: len(ids) for kind, ids in self.changes.items()})
+            return self.changes
+
+    def _watch(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.refresh()
+            except Exception:
+                log.exception("Registry reload failed")
+
+    def start(self):
+        """Start polling in a daemon thread, unless the interval is 0."""
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name='registry-watcher', daemon=True)
+            self._thread.start()
+        return self